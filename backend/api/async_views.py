@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+
+# Пул потоков для работы с базой данных из асинхронных представлений.
+# Размер пула ограничивает число одновременных подключений к базе.
+database_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DATABASE_THREADS,
+    thread_name_prefix='async-db',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    """Функция выполнения синхронного представления в потоке пула.
+    Ответ рендерится в том же потоке, подключение к базе закрывается
+    по правилам CONN_MAX_AGE, как в конце обычного запроса.
+    SQL-запросы потока записываются в профиль запроса через контекст,
+    переданный в поток, если профилирование включено."""
+
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """Декоратор асинхронного представления для ASGI. Django 3.2 и DRF
+    не умеют асинхронно работать с ORM, поэтому представление выполняется
+    в ограниченном пуле потоков, а не в единственном потоке
+    thread_sensitive, через который ASGI обслуживает синхронный код."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            database_executor,
+            partial(context.run, run_view, view, request, *args, **kwargs),
+        )
+
+    wrapper.csrf_exempt = getattr(view, 'csrf_exempt', False)
+    return wrapper
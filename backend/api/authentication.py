@@ -0,0 +1,120 @@
+from collections import Counter, OrderedDict
+from copy import copy
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from api.conditional import bump_cache_version, get_cache_version
+
+
+class TokenCache:
+    """Кэш пользователей по токенам: LRU в памяти процесса с временем
+    жизни записей поверх общего кэша. В общем кэше хранится только
+    идентификатор пользователя, без хэша пароля и других полей, сам
+    пользователь при попадании в общий кэш читается из базы по первичному
+    ключу. Записи обоих уровней привязаны
+    к версии токена в общем кэше: выход, удаление токена или изменение
+    пользователя меняют версию только его токена. Сброс виден всем
+    воркерам только при общем кэше (CACHE_SHARED), без него кэш
+    не используется."""
+
+    def __init__(self, size, timeout):
+        """Инициализация кэша: размер LRU и время жизни записей."""
+
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.stats = Counter()
+
+    def get_version_key(self, key):
+        """Ключ версии токена в общем кэше. Токен хранится в виде хэша."""
+
+        return f'auth:token:{sha256(key.encode()).hexdigest()}:version'
+
+    def get_shared_key(self, version, key):
+        """Ключ записи токена в общем кэше."""
+
+        return f'auth:token:{sha256(key.encode()).hexdigest()}:{version}'
+
+    def get(self, key):
+        """Метод получения пользователя по токену. Возвращает
+        пользователя или None и версию токена, прочитанную до обращения
+        к базе: с ней сохраняется найденный в базе пользователь, чтобы
+        сброс во время запроса к базе не оставил устаревшую запись."""
+
+        version = get_cache_version(self.get_version_key(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] > monotonic():
+                self._entries.move_to_end(key)
+                self.stats['local_hits'] += 1
+                return copy(entry[2]), version
+        user_id = cache.get(self.get_shared_key(version, key))
+        user = None
+        if user_id is not None:
+            user = get_user_model().objects.filter(
+                pk=user_id, is_active=True
+            ).first()
+        if user is None:
+            self.stats['misses'] += 1
+            return None, version
+        self.stats['shared_hits'] += 1
+        self.store(version, key, user)
+        return copy(user), version
+
+    def set(self, key, user, version):
+        """Метод сохранения пользователя токена в оба уровня кэша
+        с версией, полученной из get: в общий кэш попадает только
+        идентификатор пользователя."""
+
+        cache.set(self.get_shared_key(version, key), user.pk, self.timeout)
+        self.store(version, key, user)
+
+    def store(self, version, key, user):
+        """Метод сохранения записи в LRU процесса."""
+
+        with self._lock:
+            self._entries[key] = (version, monotonic() + self.timeout, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Метод сброса записей токена во всех процессах."""
+
+        bump_cache_version(self.get_version_key(key))
+        with self._lock:
+            self._entries.pop(key, None)
+        self.stats['invalidations'] += 1
+
+    def get_stats(self):
+        """Счетчики попаданий и промахов процесса и размер LRU."""
+
+        return {**self.stats, 'size': len(self._entries)}
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пользователя. Запрос
+    к таблице токенов выполняется только при промахе кэша."""
+
+    def authenticate_credentials(self, key):
+        """Метод получения пользователя и токена по ключу. Без общего
+        кэша пользователь всегда читается из базы."""
+
+        if not settings.CACHE_SHARED:
+            return super().authenticate_credentials(key)
+        user, version = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, version)
+            return user, token
+        return user, self.get_model()(key=key, user=user)
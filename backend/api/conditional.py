@@ -0,0 +1,112 @@
+from calendar import timegm
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date
+
+USERS_VERSION_KEY = 'conditional:users:version'
+
+
+def get_relations_version_key(user_id):
+    """Ключ версии избранного, покупок и подписок пользователя."""
+
+    return f'conditional:relations:{user_id}:version'
+
+
+def get_cache_version(key):
+    """Функция получения версии из общего кэша."""
+
+    return cache.get_or_set(key, lambda: uuid4().hex, timeout=None)
+
+
+def bump_cache_version(key):
+    """Функция смены версии в общем кэше."""
+
+    cache.set(key, uuid4().hex, timeout=None)
+
+
+def make_etag(*parts):
+    """Функция формирования ETag из частей состояния ресурса."""
+
+    digest = md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_timestamp(value):
+    """Функция перевода даты в секунды для заголовка Last-Modified."""
+
+    return timegm(value.utctimetuple()) if value else None
+
+
+class ConditionalRequestMixin:
+    """Миксин условных запросов для list и retrieve. Валидаторы ETag и
+    Last-Modified вычисляются до сериализации, при совпадении
+    возвращается 304. Если есть ETag, проверяется только он: дата
+    изменения не отражает удаление объектов и изменения связей."""
+
+    def get_list_validators(self, request):
+        """Метод получения ETag и Last-Modified списка."""
+
+        return None, None
+
+    def get_detail_validators(self, request, *args, **kwargs):
+        """Метод получения ETag и Last-Modified объекта."""
+
+        return None, None
+
+    def get_user_state(self, request):
+        """Метод получения состояния, от которого зависят
+        пользовательские поля ответа."""
+
+        user = request.user
+        if not user.is_authenticated:
+            return None, get_cache_version(USERS_VERSION_KEY)
+        return (
+            user.pk,
+            get_cache_version(get_relations_version_key(user.pk)),
+            get_cache_version(USERS_VERSION_KEY),
+        )
+
+    def conditional_response(self, request, validators, handler,
+                             *args, **kwargs):
+        """Метод выполнения запроса с учетом валидаторов."""
+
+        etag, last_modified = validators
+        if etag is None and last_modified is None:
+            return handler(request, *args, **kwargs)
+        timestamp = get_timestamp(last_modified)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=None if etag else timestamp,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        if etag:
+            response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Список с поддержкой условных запросов."""
+
+        return self.conditional_response(
+            request, self.get_list_validators(request),
+            super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Объект с поддержкой условных запросов."""
+
+        return self.conditional_response(
+            request, self.get_detail_validators(request, *args, **kwargs),
+            super().retrieve, *args, **kwargs
+        )
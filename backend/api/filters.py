@@ -1,7 +1,13 @@
+from django.db.models import (Case, Exists, IntegerField, OuterRef, Value,
+                              When)
 from django_filters import rest_framework as filter
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
 
-from recipes.models import Recipe, Tag
+from foodgram_backend.settings import (INGREDIENT_AUTOCOMPLETE_LIMIT,
+                                       INGREDIENT_AUTOCOMPLETE_MAX_LIMIT)
+from recipes.models import Recipe
+from recipes.reference_cache import tag_cache
 
 
 class TagFilter(SearchFilter):
@@ -10,36 +16,113 @@ class TagFilter(SearchFilter):
     search_param = 'name'
 
 
-class IngredientFilter(SearchFilter):
-    """Фильтр ингредиентов по имени."""
+class IngredientFilter(BaseFilterBackend):
+    """Фильтр ингредиентов по имени в режиме автодополнения.
+    Сначала выдаются ингредиенты, начинающиеся с запроса, затем
+    содержащие его. Количество результатов списка ограничено."""
 
     search_param = 'name'
+    limit_param = 'limit'
+
+    def get_limit(self, request):
+        """Метод получения ограничения выдачи из параметров запроса."""
+
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return INGREDIENT_AUTOCOMPLETE_LIMIT
+        return max(1, min(limit, INGREDIENT_AUTOCOMPLETE_MAX_LIMIT))
+
+    def filter_queryset(self, request, queryset, view):
+        """Метод фильтрации и ранжирования ингредиентов."""
+
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name:
+            return queryset
+        queryset = queryset.filter(name__icontains=name).annotate(
+            is_prefix=Case(
+                When(name__istartswith=name, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('is_prefix', 'name')
+        if getattr(view, 'action', None) == 'list':
+            return queryset[:self.get_limit(request)]
+        return queryset
 
 
-class RecipeFilter(filter.FilterSet):
-    """Фильтр рецептов по автору, тегам, спискам покупок и избранного."""
+class RecipeTagFilter(BaseFilterBackend):
+    """Фильтр рецептов по тегам. Slug тегов переводятся в идентификаторы
+    по справочному кэшу, рецепты отбираются подзапросами EXISTS, поэтому
+    результат не содержит повторов без DISTINCT. Параметр tags_mode
+    задает режим: any - любой из тегов, all - все теги."""
+
+    tags_param = 'tags'
+    mode_param = 'tags_mode'
+    modes = ('any', 'all')
+
+    def get_tag_ids(self, request):
+        """Метод получения идентификаторов тегов из параметров запроса."""
+
+        slugs = request.query_params.getlist(self.tags_param)
+        return {tag.id for tag in tag_cache.get_by('slug', slugs)}, slugs
+
+    def tag_exists(self, tag_ids):
+        """Подзапрос наличия у рецепта тега из списка."""
+
+        return Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        ))
+
+    def filter_queryset(self, request, queryset, view):
+        """Метод фильтрации рецептов по тегам."""
+
+        mode = request.query_params.get(self.mode_param, 'any')
+        if mode not in self.modes:
+            raise ValidationError({
+                self.mode_param: 'Допустимые значения: ' + ', '.join(
+                    self.modes
+                )
+            })
+        tag_ids, slugs = self.get_tag_ids(request)
+        if not slugs:
+            return queryset
+        if not tag_ids or (mode == 'all' and len(tag_ids) < len(set(slugs))):
+            return queryset.none()
+        if mode == 'any':
+            return queryset.filter(self.tag_exists(tag_ids))
+        for tag_id in tag_ids:
+            queryset = queryset.filter(self.tag_exists([tag_id]))
+        return queryset
 
-    tags = filter.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        label='Tags',
-        to_field_name='slug',
-    )
+
+class RecipeFilter(filter.FilterSet):
+    """Фильтр рецептов по автору, спискам покупок и избранного.
+    Фильтр по тегам выполняет RecipeTagFilter."""
 
     is_favorited = filter.BooleanFilter(method='get_favorite')
     is_in_shopping_cart = filter.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    ordering = filter.ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='get_ordering',
+    )
+
+    # Сортировки рецептов, доступные в параметре ordering.
+    orderings = {
+        'popular': ('-popularity', '-id'),
+    }
 
     class Meta:
         """Мета настройки фильтра рецептов."""
 
         model = Recipe
         fields = (
-            'tags',
             'author',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'ordering',
         )
 
     def get_favorite(self, queryset, name, value):
@@ -57,3 +140,8 @@ class RecipeFilter(filter.FilterSet):
         if value and self.request:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_ordering(self, queryset, name, value):
+        """Метод сортировки рецептов по популярности."""
+
+        return queryset.order_by(*self.orderings[value])
@@ -1,7 +1,190 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """Функция оценки количества строк выборки по плану запроса
+    PostgreSQL. Для других баз данных выполняется точный подсчет."""
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.values('pk').order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CursorPaginationMixin:
+    """Миксин курсорной (keyset) пагинации. Включается параметром
+    ?cursor= для вьюсетов и действий с атрибутом cursor_ordering.
+    Страница выбирается условием по ключу сортировки вместо OFFSET,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    Общее количество по умолчанию не считается, ?count=exact
+    возвращает точное значение, ?count=estimate - оценку планировщика."""
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Метод выбора режима пагинации."""
+
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            and getattr(view, 'cursor_ordering', None) is not None
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_queryset_by_cursor(
+            queryset, request, view.cursor_ordering
+        )
+
+    def get_cursor_page_size(self, request):
+        """Метод получения размера страницы курсорного режима."""
+
+        return self.get_page_size(request) or 10
+
+    def decode_cursor(self, request):
+        """Метод разбора курсора из параметров запроса. Поврежденный
+        курсор или курсор другой сортировки дает ошибку 400."""
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            values, reverse = cursor['v'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise ParseError('Неверный курсор.')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ParseError('Неверный курсор.')
+        return values, reverse
+
+    def encode_cursor(self, instance, reverse):
+        """Метод формирования ссылки с курсором на объект или строку
+        values(). Даты записываются с микросекундами: DjangoJSONEncoder
+        округляет их до миллисекунд, и курсор пропускал бы соседние
+        объекты."""
+
+        if isinstance(instance, dict):
+            values = [instance[name] for name, _ in self.ordering]
+        else:
+            values = [getattr(instance, name) for name, _ in self.ordering]
+        values = [value.isoformat() if isinstance(value, datetime) else value
+                  for value in values]
+        encoded = urlsafe_b64encode(json.dumps(
+            {'v': values, 'r': int(reverse)}, cls=DjangoJSONEncoder
+        ).encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
 
+    def get_key_field(self, queryset, name):
+        """Метод получения поля модели или аннотации ключа сортировки."""
 
-class LimitOffsetPagination(PageNumberPagination):
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+
+    def get_keyset_filter(self, queryset, values, reverse):
+        """Метод построения условия "строго после ключа" для
+        сортировки вида (-поле1, -поле2, ...)."""
+
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            value = self.get_key_field(queryset, name).to_python(value)
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset_by_cursor(self, queryset, request, ordering):
+        """Метод выборки страницы по курсору."""
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        values, reverse = self.decode_cursor(request)
+        page_size = self.get_cursor_page_size(request)
+
+        self.count = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimate_count(queryset)
+
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(
+                    queryset, values, reverse
+                ))
+            except (ValidationError, TypeError, ValueError):
+                raise ParseError('Неверный курсор.')
+        order_by = [
+            ('-' if descending != reverse else '') + name
+            for name, descending in self.ordering
+        ]
+        results = list(queryset.order_by(*order_by)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else values is not None
+        has_previous = has_more if reverse else values is not None
+        self.next_link = (
+            self.encode_cursor(results[-1], reverse=False)
+            if has_next and results else None
+        )
+        self.previous_link = (
+            self.encode_cursor(results[0], reverse=True)
+            if has_previous and results else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        """Метод формирования ответа с учетом режима пагинации."""
+
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.next_link
+        response['previous'] = self.previous_link
+        response['results'] = data
+        return Response(response)
+
+
+class LimitOffsetPagination(CursorPaginationMixin, PageNumberPagination):
     """Настройка размера выдачи пагинации."""
 
     page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class UserPagination(CursorPaginationMixin, PageNumberPagination):
+    """Пагинация пользователей и подписок."""
+
+    page_size_query_param = 'limit'
+    max_page_size = 100
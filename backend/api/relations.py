@@ -0,0 +1,114 @@
+"""Связи текущего пользователя: рецепты в избранном и в списке покупок
+и авторы в подписках. Все множества загружаются одним запросом при
+первом обращении и используются всеми сериализаторами запроса вместо
+проверки существования связи для каждого объекта. Между запросами
+множества хранятся в общем кэше под версией связей пользователя,
+которую меняют сигналы изменения связей."""
+
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import IntegerField, Value
+
+from api.conditional import get_cache_version, get_relations_version_key
+from recipes.models import FavoriteRecipe, ShoppingCart
+from users.models import Subscription
+
+# Множества связей: модель связи и поле идентификатора объекта.
+RELATIONS = {
+    'favorites': (FavoriteRecipe, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+
+class UserRelations:
+    """Множества идентификаторов связанных объектов пользователя."""
+
+    def __init__(self, user):
+        """Инициализация связей пользователя. У анонимного пользователя
+        связей нет."""
+
+        self.user_id = user.pk if user.is_authenticated else None
+        self._sets = None
+
+    def get(self, name):
+        """Метод получения множества связей по имени."""
+
+        if self._sets is None:
+            self._sets = self.load()
+        return self._sets[name]
+
+    def contains(self, name, pk):
+        """Метод проверки наличия объекта в множестве связей."""
+
+        return pk in self.get(name)
+
+    def load(self):
+        """Метод загрузки множеств из общего кэша или из базы одним
+        запросом UNION ALL. В кэше идентификаторы хранятся массивами
+        64-битных чисел. Без общего кэша (CACHE_SHARED) множества
+        загружаются из базы в каждом запросе."""
+
+        if self.user_id is None:
+            return {name: frozenset() for name in RELATIONS}
+        timeout = settings.CACHE_SHARED and settings.RELATIONS_CACHE_TIMEOUT
+        if timeout:
+            version = get_cache_version(
+                get_relations_version_key(self.user_id)
+            )
+            key = f'relations:{self.user_id}:{version}'
+            packed = cache.get(key)
+            if packed is not None:
+                return {name: frozenset(unpack_ids(ids))
+                        for name, ids in packed.items()}
+        names = list(RELATIONS)
+        querysets = [
+            model.objects.filter(user_id=self.user_id).order_by().annotate(
+                relation=Value(index, output_field=IntegerField())
+            ).values_list(field, 'relation')
+            for index, (model, field) in enumerate(RELATIONS.values())
+        ]
+        ids = {name: set() for name in names}
+        for pk, index in querysets[0].union(*querysets[1:], all=True):
+            ids[names[index]].add(pk)
+        if timeout:
+            cache.set(key, {name: array('q', sorted(values)).tobytes()
+                            for name, values in ids.items()}, timeout)
+        return {name: frozenset(values) for name, values in ids.items()}
+
+    def invalidate(self):
+        """Метод сброса множеств после изменения связей в запросе."""
+
+        self._sets = None
+
+
+def unpack_ids(packed):
+    """Массив идентификаторов из байтового представления."""
+
+    ids = array('q')
+    ids.frombytes(packed)
+    return ids
+
+
+def get_user_relations(request):
+    """Связи пользователя запроса, общие для всех сериализаторов."""
+
+    relations = getattr(request, 'user_relations', None)
+    if relations is None:
+        relations = UserRelations(request.user)
+        request.user_relations = relations
+    return relations
+
+
+class UserRelationsMixin:
+    """Миксин вьюсетов, передающий связи пользователя в контекст
+    сериализаторов."""
+
+    def get_serializer_context(self):
+        """Контекст сериализаторов со связями пользователя."""
+
+        context = super().get_serializer_context()
+        context['relations'] = get_user_relations(self.request)
+        return context
@@ -0,0 +1,54 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson. Ответ совпадает с ответом JSONRenderer:
+    компактные разделители, UTF-8 без экранирования и экранированные
+    U+2028 и U+2029. Даты и типы, которые orjson не сериализует сам,
+    передаются кодировщику DRF."""
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Метод рендеринга данных в JSON."""
+
+        if data is None:
+            return b''
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=options
+        )
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class FileFormatRenderer(FastJSONRenderer):
+    """Рендерер выбора формата выгрузки файла. Сам файл отдается
+    представлением, а ошибки рендерятся в JSON с типом
+    application/json, как и в остальных эндпоинтах."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Метод рендеринга ответа с ошибкой в JSON."""
+
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.status_code >= 400:
+            response['Content-Type'] = FastJSONRenderer.media_type
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class PlainTextRenderer(FileFormatRenderer):
+    """Рендерер для выбора текстового формата выгрузки через ?format=txt."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(FileFormatRenderer):
+    """Рендерер для выбора формата CSV через ?format=csv."""
+
+    media_type = 'text/csv'
+    format = 'csv'
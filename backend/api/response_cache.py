@@ -0,0 +1,169 @@
+"""Общий кэш готовых ответов для анонимных запросов списка и страницы
+рецепта. Ключ состоит из нормализованных параметров запроса и версий
+данных, входящих в ответ: при изменении рецепта, его тегов, ингредиентов
+или профиля автора версия меняется, и старые записи больше не читаются."""
+
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+
+from api.conditional import bump_cache_version, get_cache_version
+from recipes.models import Recipe
+from recipes.reference_cache import ingredient_cache, tag_cache
+
+RECIPES_VERSION_KEY = 'response:recipes:version'
+
+
+def get_recipe_version_key(recipe_id):
+    """Ключ версии ответа с рецептом."""
+
+    return f'response:recipe:{recipe_id}:version'
+
+
+def bump_recipe_versions(*recipe_ids):
+    """Смена версий рецептов и списков рецептов."""
+
+    bump_cache_version(RECIPES_VERSION_KEY)
+    for recipe_id in recipe_ids:
+        bump_cache_version(get_recipe_version_key(recipe_id))
+
+
+def get_author_version_key(author_id):
+    """Ключ версии профиля автора в ответах с рецептами."""
+
+    return f'response:author:{author_id}:version'
+
+
+def bump_author_versions(author_id):
+    """Смена версий профиля автора и списков рецептов."""
+
+    bump_cache_version(RECIPES_VERSION_KEY)
+    bump_cache_version(get_author_version_key(author_id))
+
+
+class AnonymousResponseCacheMixin:
+    """Миксин кэширования ответов list и retrieve для анонимных
+    пользователей. Кэшируются только JSON-ответы на запросы с параметрами
+    из cache_query_params. Запись хранит отрендеренное тело, ETag
+    и версии зависимостей ответа, при попадании ответ отдается без
+    обращения к базе данных."""
+
+    cache_query_params = ('tags', 'author', 'page', 'limit')
+
+    def is_response_cacheable(self, request):
+        """Проверка, что ответ на запрос можно взять из кэша. Без общего
+        кэша (CACHE_SHARED) сброс версий не дошел бы до других воркеров,
+        поэтому ответы не кэшируются."""
+
+        return not (
+            not settings.CACHE_SHARED
+            or not settings.RESPONSE_CACHE_TIMEOUT
+            or request.user.is_authenticated
+            or request.accepted_renderer.format != 'json'
+            or set(request.query_params) - set(self.cache_query_params)
+        )
+
+    def get_response_cache_key(self, request, *versions):
+        """Ключ записи кэша по параметрам запроса и версиям данных."""
+
+        params = request.query_params
+        normalized = [
+            (name, sorted(params.getlist(name)))
+            for name in self.cache_query_params if name in params
+        ]
+        digest = md5(repr((
+            self.action,
+            request.build_absolute_uri(request.path),
+            normalized,
+            tag_cache.get_version(),
+            ingredient_cache.get_version(),
+            *versions,
+        )).encode()).hexdigest()
+        return f'response:{digest}'
+
+    def cached_response(self, request, key, handler, *args, **kwargs):
+        """Ответ из кэша или выполнение запроса с сохранением ответа.
+        Версии зависимостей читаются до выполнения запроса: изменение
+        данных во время запроса сменит версию, и запись не будет прочитана."""
+
+        cached = cache.get(key)
+        if cached is not None and all(
+            get_cache_version(version_key) == version
+            for version_key, version in cached[3].items()
+        ):
+            content, content_type, etag, _ = cached
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            if etag:
+                response['ETag'] = etag
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+            return response
+        versions = {
+            version_key: get_cache_version(version_key)
+            for version_key in self.get_dependency_keys(*args, **kwargs)
+        }
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(key, (
+                response.content,
+                response['Content-Type'],
+                response.get('ETag'),
+                versions,
+            ), settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def get_dependency_keys(self, *args, **kwargs):
+        """Ключи версий данных ответа, не входящих в ключ записи.
+        Страница рецепта зависит от профиля автора, который не меняется
+        у рецепта и читается одним запросом только при промахе кэша.
+        Списки сбрасываются общей версией списков."""
+
+        if self.action != 'retrieve':
+            return []
+        try:
+            author_id = Recipe.objects.filter(
+                pk=kwargs[self.lookup_field]
+            ).values_list('author_id', flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return []
+        if author_id is None:
+            return []
+        return [get_author_version_key(author_id)]
+
+    def list(self, request, *args, **kwargs):
+        """Список с кэшированием анонимных ответов."""
+
+        if not self.is_response_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        key = self.get_response_cache_key(
+            request, get_cache_version(RECIPES_VERSION_KEY)
+        )
+        return self.cached_response(
+            request, key, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Объект с кэшированием анонимных ответов."""
+
+        if not self.is_response_cacheable(request):
+            return super().retrieve(request, *args, **kwargs)
+        recipe_id = kwargs[self.lookup_field]
+        key = self.get_response_cache_key(
+            request,
+            recipe_id,
+            get_cache_version(get_recipe_version_key(recipe_id)),
+        )
+        return self.cached_response(
+            request, key, super().retrieve, *args, **kwargs
+        )
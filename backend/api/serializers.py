@@ -1,19 +1,39 @@
 import base64
+import binascii
+from collections import defaultdict
+from tempfile import SpooledTemporaryFile
+
 import webcolors
+from PIL import Image
 from djoser.serializers import UserSerializer, UserCreateSerializer
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
 from django.core.validators import MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.relations import get_user_relations
 from api.utils import convert_ingredient_data_for_create
+from recipes.images import get_image_url, get_image_url_by_name
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredientsAmount, ShoppingCart, Tag)
+                            RecipeIngredientsAmount, ShoppingCart,
+                            ShoppingListIngredient, Tag)
+from recipes.reference_cache import ingredient_cache, tag_cache
 from users.models import User, Subscription
 
 
+def get_relations(context):
+    """Связи пользователя запроса из контекста сериализатора."""
+
+    relations = context.get('relations')
+    if relations is None and context.get('request') is not None:
+        relations = get_user_relations(context['request'])
+    return relations
+
+
 class Hex2NameColor(serializers.Field):
     """Модель сериализатора цветов, преобразующий
     hex-код цвета в строковое название."""
@@ -35,16 +55,88 @@ class Base64ImageField(serializers.ImageField):
     """Модель сериализатора изображений.
     Преобразует код base64 в изображение."""
 
+    chunk_size = 64 * 1024
+
+    def decode(self, encoded, name):
+        """Метод декодирования base64 по частям во временный файл.
+        Размер файла проверяется до декодирования, размеры изображения -
+        по заголовку файла, до чтения пикселей. Переводы строк
+        и пробелы удаляются заранее, чтобы части содержали целое число
+        групп base64."""
+
+        encoded = ''.join(encoded.split())
+        if len(encoded) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Размер изображения не должен превышать '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)} МБ.'
+            )
+        image_file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            for start in range(0, len(encoded), self.chunk_size):
+                image_file.write(base64.b64decode(
+                    encoded[start:start + self.chunk_size]
+                ))
+            image_file.seek(0)
+            width, height = Image.open(image_file).size
+        except (binascii.Error, OSError, Image.DecompressionBombError):
+            image_file.close()
+            raise serializers.ValidationError(
+                self.error_messages['invalid_image']
+            )
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            image_file.close()
+            raise serializers.ValidationError(
+                'Изображение слишком большое: '
+                f'{width}x{height} пикселей.'
+            )
+        image_file.seek(0)
+        return File(image_file, name=name)
+
     def to_internal_value(self, data):
         """Функция декодировки base64 в изображение."""
 
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(imgstr, name='temp.' + ext)
         return super().to_internal_value(data)
 
 
+class RecipeImageField(serializers.ReadOnlyField):
+    """Модель сериализатора изображения рецепта. Возвращает адрес
+    уменьшенной копии: для списков - миниатюру, для рецепта - копию
+    детального размера."""
+
+    def __init__(self, variant=None, **kwargs):
+        """Инициализация поля. Без явного варианта он выбирается
+        по действию представления."""
+
+        self.variant = variant
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def get_variant(self):
+        """Метод выбора варианта изображения."""
+
+        if self.variant:
+            return self.variant
+        view = self.context.get('view')
+        if getattr(view, 'action', None) in ('list', 'feed'):
+            return 'thumbnail'
+        return 'detail'
+
+    def to_representation(self, recipe):
+        """Метод получения адреса изображения."""
+
+        url = get_image_url(recipe, self.get_variant())
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     """ Сериализатор создания объекта пользователя. Переопределяет модель
     и поля сериализации для djoser'a."""
@@ -80,13 +172,15 @@ class CustomUserSerializer(UserSerializer):
         ]
 
     def get_is_subscribed(self, user):
-        """Метод определения существования подписки на пользователя."""
-        
-        request = self.context.get('request')
-        return False if not request else Subscription.objects.filter(
-            user=request.user,
-            author=user
-        ).exists()
+        """Метод определения существования подписки на пользователя.
+        Использует аннотацию is_subscribed, если она уже вычислена."""
+
+        if hasattr(user, 'is_subscribed'):
+            return user.is_subscribed
+        relations = get_relations(self.context)
+        return relations is not None and relations.contains(
+            'subscriptions', user.pk
+        )
 
 
 class FullVievUserSerializer(CustomUserSerializer):
@@ -94,7 +188,7 @@ class FullVievUserSerializer(CustomUserSerializer):
     с полным прпедставлением, включая рецепты."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         """Мета класс наследованный от кастомногог сериализатора модели
@@ -105,28 +199,26 @@ class FullVievUserSerializer(CustomUserSerializer):
                                                      'recipes_count']
 
     def get_recipes(self, user):
-        """Метод запроса рецептов пользователя."""
+        """Метод запроса рецептов пользователя. Использует рецепты,
+        предварительно загруженные для страницы подписок."""
 
         request = self.context.get('request')
-        recipes = Recipe.objects.filter(author=user)
-
         if not request or request.user.is_anonymous:
             return False
 
-        limit = request.query_params.get('recipes_limit')
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(user, 'subscription_recipes'):
+            recipes = user.subscription_recipes
+        else:
+            recipes = Recipe.objects.filter(author=user)
+            limit = request.query_params.get('recipes_limit')
+            if limit:
+                recipes = recipes[:int(limit)]
         return ShortRecipeSerializer(
             recipes,
             many=True,
-            context={'request': request}
+            context=self.context
         ).data
 
-    def get_recipes_count(self, user):
-        """Метод выборки количества рецептов пользователя."""
-
-        return user.recipe.all().count()
-
 
 class UserSubscribeSerializer(serializers.ModelSerializer):
     """Сериализатор подписки на автора"""
@@ -149,7 +241,7 @@ class UserSubscribeSerializer(serializers.ModelSerializer):
 
         return CustomUserSerializer(
             instance.author,
-            context={'request': self.context.get('request')}
+            context=self.context
         ).data
 
 
@@ -158,17 +250,18 @@ class SubscriptionsSerializer(UserSubscribeSerializer):
 
     class Meta:
         """Поля модели подписки"""
-ы
         model = Subscription
         fields = ('user', 'author')
 
     def to_representation(self, instance):
         """Метод репрезентации подписок.
-        Возвращает пользователя с рецептами."""
+        Возвращает пользователя с рецептами. Подписка на автора
+        в этом контексте всегда существует."""
 
+        instance.author.is_subscribed = True
         return FullVievUserSerializer(
             instance.author,
-            context={'request': self.context.get('request')}
+            context=self.context
         ).data
 
 
@@ -252,23 +345,72 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
-    def validate(self, recipe_data):
-        """Валидация ингредиентов рецепта при создании."""
+    def validate_ingredients(self, ingredients):
+        """Валидация ингредиентов рецепта: существование ингредиентов
+        проверяется по кэшу справочника, отсутствующие в кэше
+        идентификаторы проверяются одним запросом к базе, повторы
+        и неположительные количества не допускаются. Ошибки
+        возвращаются по позициям списка."""
+
+        if not ingredients:
+            raise serializers.ValidationError('Добавьте ингредиенты')
+        ids = [ingredient['id'] for ingredient in ingredients]
+        existing = {record.id for record in ingredient_cache.get_many(ids)}
+        seen = set()
+        errors = []
+        for ingredient in ingredients:
+            error = {}
+            if ingredient['id'] not in existing:
+                error['id'] = [f'Ингредиента {ingredient["id"]} нет.']
+            elif ingredient['id'] in seen:
+                error['id'] = [
+                    f'Ингредиент {ingredient["id"]} указан повторно.'
+                ]
+            if ingredient['amount'] <= 0:
+                error['amount'] = [
+                    'Нельзя установить количество ингредиента, '
+                    f'равное {ingredient["amount"]}'
+                ]
+            seen.add(ingredient['id'])
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ingredients
+
+    def validate_tag_ids(self, tags):
+        """Валидация идентификаторов тегов по кэшу справочника
+        с проверкой отсутствующих в нем идентификаторов по базе."""
+
+        if not isinstance(tags, list) or not tags:
+            raise serializers.ValidationError({'tags': ['Добавьте теги']})
+        errors = []
+        ids = []
+        for tag in tags:
+            try:
+                tag_id = int(tag)
+            except (TypeError, ValueError):
+                errors.append(f'Некорректный идентификатор тега {tag}.')
+                continue
+            if tag_id in ids:
+                errors.append(f'Тег {tag_id} указан повторно.')
+            ids.append(tag_id)
+        existing = {record.id for record in tag_cache.get_many(ids)}
+        errors.extend(
+            f'Тега {tag_id} нет.' for tag_id in ids if tag_id not in existing
+        )
+        if errors:
+            raise serializers.ValidationError({'tags': errors})
+        return ids
 
-        ingredients = self.initial_data.get('ingredients')
-        if len(ingredients) <= 0:
-            raise serializers.ValidationError(
-                {'message': 'Добавьте ингредиенты'}
-            )
+    def validate(self, recipe_data):
+        """Валидация тегов рецепта. Все проверки выполняются до записи
+        в базу. При частичном изменении теги можно не передавать."""
 
-        for ingredient in ingredients:
-            amount = int(ingredient['amount'])
-            if not amount > 0:
-                raise serializers.ValidationError(
-                    {'message':
-                     'Нельзя установить количество '
-                     f'ингредиента, равное {amount}'}
-                )
+        if self.partial and 'tags' not in self.initial_data:
+            return recipe_data
+        recipe_data['tags'] = self.validate_tag_ids(
+            self.initial_data.get('tags')
+        )
         return recipe_data
 
     def create_ingredient_amount(self, ingredients, recipe):
@@ -292,46 +434,109 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 {'message': 'Авторизуйтесь, чтобы добавить рецепт'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
-        tags = self.initial_data.get('tags')
+        tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-        self.create_ingredient_amount(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.set(tags)
+            self.create_ingredient_amount(ingredients, recipe)
         return recipe
 
+    def update_ingredient_amounts(self, ingredients, recipe):
+        """Метод обновления ингредиентов рецепта по разнице
+        с сохраненными: создаются, изменяются и удаляются только
+        отличающиеся строки. Возвращает изменения количеств
+        по ингредиентам."""
+
+        amounts = {ingredient['id']: ingredient['amount']
+                   for ingredient in ingredients}
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredientsAmount.objects.filter(recipe=recipe)
+        }
+        deltas = {
+            ingredient_id: amounts.get(ingredient_id, 0) - row.amount
+            for ingredient_id, row in current.items()
+        }
+        created = {ingredient_id: amount
+                   for ingredient_id, amount in amounts.items()
+                   if ingredient_id not in current}
+        deltas.update(created)
+        changed = []
+        for ingredient_id, row in current.items():
+            if ingredient_id in amounts and deltas[ingredient_id]:
+                row.amount = amounts[ingredient_id]
+                changed.append(row)
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredientsAmount.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        RecipeIngredientsAmount.objects.bulk_update(changed, ['amount'])
+        RecipeIngredientsAmount.objects.bulk_create(
+            [RecipeIngredientsAmount(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            ) for ingredient_id, amount in created.items()]
+        )
+        return deltas
+
     def update(self, instance, validated_data):
-        """Метод обновления рецепта."""
+        """Метод обновления рецепта. Ингредиенты и теги изменяются
+        по разнице с сохраненными в одной транзакции, суммы списков
+        покупок меняются только по изменившимся ингредиентам. Строка
+        рецепта блокируется до чтения ингредиентов, поэтому
+        параллельные изменения рецепта считают разницу по очереди.
+        Не переданные при частичном изменении ингредиенты и теги
+        не меняются."""
 
         request = self.context.get('request')
-        recipe = get_object_or_404(Recipe, pk=instance.id)
-
         if not (request.user and (
             request.user.is_authenticated
-            and request.user == recipe.author)
+            and request.user == instance.author)
         ):
             return Response(
                 {'message':
                  'Чтобы редактировать рецепт, нужно быть его автором.'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        RecipeIngredientsAmount.objects.filter(recipe=instance).delete()
-        tags = self.initial_data.get('tags')
-        recipe.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredient_amount(ingredients, instance)
-        if validated_data.get('image'):
-            instance.image = validated_data.pop('image')
-        instance.cooking_time = validated_data.pop('cooking_time')
-        instance.save()
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if not validated_data.get('image'):
+            validated_data.pop('image', None)
+        with transaction.atomic():
+            list(Recipe.objects.select_for_update().filter(
+                pk=instance.pk
+            ).values_list('pk', flat=True))
+            if ingredients is not None:
+                deltas = self.update_ingredient_amounts(ingredients, instance)
+                if any(deltas.values()):
+                    ShoppingListIngredient.objects.apply_amounts(
+                        deltas,
+                        ShoppingCart.objects.filter(
+                            recipe=instance
+                        ).values_list('user_id', flat=True)
+                    )
+            if tags is not None:
+                instance.tags.set(tags)
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            instance.save()
         return instance
 
     def to_representation(self, instance):
         """Метод репрезентации сериализации через
-        сериализатор для чтения рецептов."""
+        сериализатор для чтения рецептов. Ингредиенты подгружаются
+        одним запросом вместе со справочными данными."""
 
+        prefetch_related_objects([instance], Prefetch(
+            'recipe',
+            queryset=RecipeIngredientsAmount.objects.select_related(
+                'ingredient'
+            ).order_by('recipe_id', 'id')
+        ))
         return ReadRecipeSerializer(
             instance,
-            context={'request': self.context.get('request')}
+            context=self.context
         ).data
 
 
@@ -340,9 +545,10 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
 
     author = CustomUserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField(read_only=True)
-    tags = TagSerializer(read_only=True, many=True)
+    tags = serializers.SerializerMethodField(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image = RecipeImageField()
 
     class Meta:
         """Мета настройки сериализатора."""
@@ -360,34 +566,188 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def get_tags(self, obj):
+        """Метод получения тегов рецепта из справочного кэша.
+        Из базы нужны только идентификаторы тегов."""
+
+        return TagSerializer(
+            tag_cache.get_many(tag.pk for tag in obj.tags.all()),
+            many=True
+        ).data
+
     def get_ingredients(self, obj):
         """Метод получения ингридиента для чтения."""
 
-        ingredients = RecipeIngredientsAmount.objects.filter(recipe=obj)
-        return ReadIngredientamountSerializer(ingredients, many=True).data
+        return ReadIngredientamountSerializer(
+            obj.recipe.all(), many=True
+        ).data
 
     def get_is_favorited(self, obj):
         """Метод получения статуса избранного рецепта."""
 
-        request = self.context.get('request')
-        return False if not request else FavoriteRecipe.objects.filter(
-            user_id=request.user.pk,
-            recipe_id=obj.pk
-        ).exists()
+        relations = get_relations(self.context)
+        return relations is not None and relations.contains(
+            'favorites', obj.pk
+        )
 
     def get_is_in_shopping_cart(self, obj):
         """Метод получения статуса добавления рецепта в список покупок."""
 
+        relations = get_relations(self.context)
+        return relations is not None and relations.contains(
+            'shopping_cart', obj.pk
+        )
+
+
+# Поля строки рецепта для списков: рецепт и профиль автора.
+RECIPE_ROW_FIELDS = (
+    'id',
+    'name',
+    'text',
+    'cooking_time',
+    'image',
+    'image_variants_of',
+    'author_id',
+    'author__email',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+)
+
+
+class RecipeRowListSerializer(serializers.ListSerializer):
+    """Сериализатор страницы рецептов из строк values() с полями
+    RECIPE_ROW_FIELDS. Ответ совпадает с ReadRecipeSerializer, но словари
+    собираются напрямую, без полей сериализаторов: теги и ингредиенты
+    страницы выбираются двумя запросами без создания моделей, названия
+    берутся из справочного кэша."""
+
+    image_variant = 'thumbnail'
+
+    def get_tags(self, recipe_ids):
+        """Метод получения тегов рецептов в порядке сортировки тегов.
+        Теги, которых еще нет в справочном кэше, дочитываются из базы."""
+
+        rows = list(Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id'))
+        records = {record.id: record for record in tag_cache.get_many(
+            {tag_id for _, tag_id in rows}
+        )}
+        tags = defaultdict(list)
+        for recipe_id, tag_id in rows:
+            if tag_id in records:
+                tags[recipe_id].append(records[tag_id])
+        return {
+            recipe_id: [
+                record._asdict() for record in sorted(
+                    recipe_tags, key=lambda record: (record.name, record.id)
+                )
+            ]
+            for recipe_id, recipe_tags in tags.items()
+        }
+
+    def get_ingredients(self, recipe_ids):
+        """Метод получения ингредиентов рецептов с количеством.
+        Ингредиенты, которых еще нет в справочном кэше, дочитываются
+        из базы."""
+
+        amounts = RecipeIngredientsAmount.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('recipe_id', 'id').values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        )
+        rows = list(amounts)
+        records = {record.id: record for record in ingredient_cache.get_many(
+            {ingredient_id for _, ingredient_id, _ in rows}
+        )}
+        ingredients = defaultdict(list)
+        for recipe_id, ingredient_id, amount in rows:
+            record = records.get(ingredient_id)
+            if record is None:
+                continue
+            ingredients[recipe_id].append({
+                'id': ingredient_id,
+                'name': record.name,
+                'measurement_unit': record.measurement_unit,
+                'amount': amount,
+            })
+        return ingredients
+
+    def to_representation(self, rows):
+        """Метод сборки представлений рецептов страницы."""
+
+        rows = list(rows)
+        if not rows:
+            return []
+        recipe_ids = [row['id'] for row in rows]
+        tags = self.get_tags(recipe_ids)
+        ingredients = self.get_ingredients(recipe_ids)
+        relations = get_relations(self.context)
+        if relations is None:
+            favorites = shopping_cart = subscriptions = frozenset()
+        else:
+            favorites = relations.get('favorites')
+            shopping_cart = relations.get('shopping_cart')
+            subscriptions = relations.get('subscriptions')
         request = self.context.get('request')
-        return False if not request else ShoppingCart.objects.filter(
-            user_id=request.user.pk,
-            recipe_id=obj.pk
-        ).exists()
+        authors = {}
+        data = []
+        for row in rows:
+            recipe_id = row['id']
+            author_id = row['author_id']
+            author = authors.get(author_id)
+            if author is None:
+                author = authors[author_id] = {
+                    'email': row['author__email'],
+                    'id': author_id,
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                    'is_subscribed': author_id in subscriptions,
+                }
+            image = get_image_url_by_name(
+                row['image'], row['image_variants_of'], self.image_variant
+            )
+            if image and request is not None:
+                image = request.build_absolute_uri(image)
+            data.append({
+                'id': recipe_id,
+                'tags': tags.get(recipe_id, []),
+                'author': author,
+                'ingredients': ingredients.get(recipe_id, []),
+                'is_favorited': recipe_id in favorites,
+                'is_in_shopping_cart': recipe_id in shopping_cart,
+                'name': row['name'],
+                'image': image,
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+            })
+        return data
+
+
+class RecipeRowSerializer(serializers.BaseSerializer):
+    """Сериализатор рецептов для чтения списков из строк values().
+    Используется только с many=True."""
+
+    class Meta:
+        """Мета настройки сериализатора."""
+
+        list_serializer_class = RecipeRowListSerializer
+
+    def to_representation(self, row):
+        """Метод представления одной строки рецепта."""
+
+        return RecipeRowListSerializer(
+            child=self, context=self.context
+        ).to_representation([row])[0]
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """ Сериализатор сокращенного отображения рецепта пользователя. """
 
+    image = RecipeImageField(variant='thumbnail')
+
     class Meta:
         """Мета настройки сериализатора."""
         model = Recipe
@@ -417,10 +777,9 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         """Метод репрезентации списка покупок в виде
         списка рецептов с кратким представлением."""
 
-        request = self.context.get('request')
         return ShortRecipeSerializer(
             instance.recipe,
-            context={'request': request}
+            context=self.context
         ).data
 
 
@@ -449,5 +808,5 @@ class FavoriteRecipesSerializer(serializers.ModelSerializer):
 
         return ShortRecipeSerializer(
             instance.recipe,
-            context={'request': self.context.get('request')}
+            context=self.context
         ).data
@@ -0,0 +1,117 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.conditional import (USERS_VERSION_KEY, bump_cache_version,
+                             get_relations_version_key)
+from api.response_cache import bump_author_versions, bump_recipe_versions
+from recipes.images import image_variants_built
+from recipes.models import (FavoriteRecipe, Recipe, RecipeIngredientsAmount,
+                            ShoppingCart)
+from recipes.popularity import popularity_rebuilt
+from users.models import Subscription, User
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_relations_version(sender, instance, **kwargs):
+    """Смена версии избранного, покупок и подписок пользователя."""
+
+    bump_cache_version(get_relations_version_key(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(sender, update_fields=None, **kwargs):
+    """Смена версии профилей пользователей. Обновление только
+    даты последнего входа не меняет ответы API."""
+
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_cache_version(USERS_VERSION_KEY)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    """Сброс кэша токена при его удалении: при выходе пользователя
+    и вместе с пользователем. Версия меняется после фиксации транзакции,
+    чтобы запрос к базе из другого процесса не сохранил удаленный токен
+    с новой версией."""
+
+    transaction.on_commit(partial(token_cache.invalidate, instance.key))
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_cache_on_user_change(sender, instance, created,
+                                          update_fields=None, **kwargs):
+    """Сброс кэша токена пользователя при его изменении, кроме
+    регистрации и обновления только даты последнего входа."""
+
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        transaction.on_commit(partial(token_cache.invalidate, key))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_response_version(sender, instance, **kwargs):
+    """Сброс кэша ответов при изменении или удалении рецепта."""
+
+    transaction.on_commit(partial(bump_recipe_versions, instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_response_version(sender, instance, action,
+                                      reverse, pk_set, **kwargs):
+    """Сброс кэша ответов при изменении тегов рецепта. При изменении
+    со стороны тега сбрасываются затронутые рецепты."""
+
+    if not action.startswith('post_'):
+        return
+    recipe_ids = (pk_set or ()) if reverse else (instance.pk,)
+    transaction.on_commit(partial(bump_recipe_versions, *recipe_ids))
+
+
+@receiver(post_save, sender=RecipeIngredientsAmount)
+@receiver(post_delete, sender=RecipeIngredientsAmount)
+def bump_recipe_ingredients_response_version(sender, instance, **kwargs):
+    """Сброс кэша ответов при изменении ингредиентов рецепта."""
+
+    transaction.on_commit(partial(bump_recipe_versions, instance.recipe_id))
+
+
+@receiver(image_variants_built)
+def bump_recipe_image_response_version(sender, recipe_id, **kwargs):
+    """Сброс кэша ответов после создания уменьшенных копий
+    изображения рецепта."""
+
+    transaction.on_commit(partial(bump_recipe_versions, recipe_id))
+
+
+@receiver(popularity_rebuilt)
+def bump_popularity_response_version(sender, **kwargs):
+    """Сброс кэша списков рецептов после пересчета популярности."""
+
+    transaction.on_commit(bump_recipe_versions)
+
+
+@receiver(post_save, sender=User)
+def bump_author_response_version(sender, instance, created,
+                                 update_fields=None, **kwargs):
+    """Сброс кэша ответов с рецептами автора при изменении профиля,
+    кроме обновления только даты последнего входа."""
+
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(partial(bump_author_versions, instance.pk))
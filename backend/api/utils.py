@@ -1,8 +1,10 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import csv
+import json
+
+from django.http import StreamingHttpResponse
 
 from foodgram_backend.settings import UPLOAD_FILE_NAME
-from recipes.models import RecipeIngredientsAmount
+from recipes.models import ShoppingListIngredient
 
 
 def convert_ingredient_data_for_create(ingredients, recipe):
@@ -21,29 +23,90 @@ def convert_ingredient_data_for_create(ingredients, recipe):
     return ingredient_list
 
 
-def get_shopping_list_file(request):
-    """Функция генерации тектового файла. Возвращает response
-    в виде файла со списком ингредиентов, необходимых для приготовления
-    рецептов, добавленных в список покупок."""
+def get_shopping_list_ingredients(user):
+    """Функция выборки ингредиентов списка покупок пользователя.
+    Суммы ингредиентов хранятся заранее посчитанными, выборка
+    выполняется одним запросом без агрегации."""
+
+    return ShoppingListIngredient.objects.filter(user=user).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount').order_by(
+            'ingredient__name', 'ingredient__measurement_unit')
+
 
-    shopping_list = "Cписок покупок:"
-    ingredients = RecipeIngredientsAmount.objects.filter(
-        recipe__shopping_cart__user=request.user).values(
-            'ingredient__name',
-            'ingredient__measurement_unit').annotate(amount=Sum('amount'))
-    for ingredient_number, ingredient in enumerate(ingredients):
-        shopping_list += (
-            f"\n{ingredient['ingredient__name']} - "
+def write_shopping_list_txt(ingredients):
+    """Генератор строк списка покупок в текстовом формате."""
+
+    yield 'Cписок покупок:'
+    separator = ''
+    for ingredient in ingredients:
+        yield (
+            f"{separator}\n{ingredient['ingredient__name']} - "
             f"{ingredient['amount']} "
             f"{ingredient['ingredient__measurement_unit']}"
         )
-        if ingredient_number < ingredients.count() - 1:
-            shopping_list += ','
-    response = HttpResponse(
-        shopping_list,
-        content_type='text/plain'
+        separator = ','
+
+
+class EchoBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        """Метод записи строки."""
+
+        return value
+
+
+def write_shopping_list_csv(ingredients):
+    """Генератор строк списка покупок в формате CSV."""
+
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(['name', 'measurement_unit', 'amount'])
+    for ingredient in ingredients:
+        yield writer.writerow([
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount'],
+        ])
+
+
+def write_shopping_list_json(ingredients):
+    """Генератор списка покупок в формате JSON."""
+
+    yield '['
+    separator = ''
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['amount'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+# Форматы выгрузки списка покупок: генератор и тип содержимого.
+SHOPPING_LIST_FORMATS = {
+    'txt': (write_shopping_list_txt, 'text/plain; charset=utf-8'),
+    'csv': (write_shopping_list_csv, 'text/csv; charset=utf-8'),
+    'json': (write_shopping_list_json, 'application/json'),
+}
+
+
+def get_shopping_list_file(request, file_format='txt'):
+    """Функция генерации файла списка покупок. Возвращает потоковый
+    response со списком ингредиентов, необходимых для приготовления
+    рецептов, добавленных в список покупок. Строки читаются из одного
+    агрегирующего запроса по мере отдачи файла."""
+
+    writer, content_type = SHOPPING_LIST_FORMATS[file_format]
+    ingredients = get_shopping_list_ingredients(request.user).iterator()
+    response = StreamingHttpResponse(
+        writer(ingredients),
+        content_type=content_type
     )
     response[
         'Content-Disposition'
-    ] = f'attachment; filename="{UPLOAD_FILE_NAME}.txt"'
+    ] = f'attachment; filename="{UPLOAD_FILE_NAME}.{file_format}"'
     return response
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Prefetch
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
@@ -6,21 +9,32 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter, TagFilter
-from api.pagination import LimitOffsetPagination
+from api.conditional import (ConditionalRequestMixin, get_cache_version,
+                             make_etag)
+from api.filters import (IngredientFilter, RecipeFilter, RecipeTagFilter,
+                         TagFilter)
+from api.pagination import LimitOffsetPagination, UserPagination
 from api.permission import IsAuthorOrAdminOrReadOnly, IsAdminOrReadOnly
-from api.serializers import (CreateRecipeSerializer, CustomUserSerializer,
-                             FavoriteRecipesSerializer, IngredientSerializer,
-                             ReadRecipeSerializer, ShoppingCartSerializer,
+from api.relations import UserRelationsMixin, get_user_relations
+from api.renderers import CSVRenderer, FastJSONRenderer, PlainTextRenderer
+from api.response_cache import (RECIPES_VERSION_KEY,
+                                AnonymousResponseCacheMixin)
+from api.serializers import (RECIPE_ROW_FIELDS, CreateRecipeSerializer,
+                             CustomUserSerializer, FavoriteRecipesSerializer,
+                             IngredientSerializer, ReadRecipeSerializer,
+                             RecipeRowSerializer, ShoppingCartSerializer,
                              SubscriptionsSerializer, TagSerializer,
                              UserSubscribeSerializer)
 from api.utils import get_shopping_list_file
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            Tag)
+from core.profiling import SerializerProfilingMixin
+from recipes.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredientsAmount, ShoppingCart, Tag)
+from recipes.reference_cache import ingredient_cache, tag_cache
 from users.models import Subscription, User
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(SerializerProfilingMixin, ConditionalRequestMixin,
+                  viewsets.ModelViewSet):
     """Вьюсет тегов."""
 
     queryset = Tag.objects.all()
@@ -31,19 +45,79 @@ class TagsViewSet(viewsets.ModelViewSet):
     search_fields = ['^name', ]
     pagination_class = None
 
+    def get_list_validators(self, request):
+        """ETag списка тегов по версии справочного кэша."""
 
-class IngridientsViewSet(viewsets.ModelViewSet):
+        return make_etag(
+            tag_cache.get_version(), request.get_full_path()
+        ), None
+
+    def list(self, request, *args, **kwargs):
+        """Список тегов с поддержкой условных запросов."""
+
+        return self.conditional_response(
+            request, self.get_list_validators(request), self.cached_list
+        )
+
+    def cached_list(self, request):
+        """Список тегов из справочного кэша без обращения к базе."""
+
+        name = request.query_params.get(TagFilter.search_param, '').strip()
+        tags = tag_cache.search(name) if name else (
+            tag_cache.all()
+        )
+        return Response(self.get_serializer(tags, many=True).data)
+
+
+class IngridientsViewSet(SerializerProfilingMixin, ConditionalRequestMixin,
+                         viewsets.ModelViewSet):
     """Вьюсет ингредиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [IsAdminOrReadOnly, ]
     filter_backends = [IngredientFilter, ]
-    search_fields = ['^name', ]
     pagination_class = None
 
+    def get_list_validators(self, request):
+        """ETag списка ингредиентов по версии справочного кэша."""
+
+        return make_etag(
+            ingredient_cache.get_version(), request.get_full_path()
+        ), None
+
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов с поддержкой условных запросов."""
 
-class RecipesViewSet(viewsets.ModelViewSet):
+        return self.conditional_response(
+            request, self.get_list_validators(request), self.cached_list
+        )
+
+    def cached_list(self, request):
+        """Список ингредиентов. Полный список и поиск, которому хватает
+        совпадений по началу названия, берутся из справочного кэша:
+        тогда выдача IngredientFilter совпадает с ними, так как все
+        совпадения префиксные и упорядочены по названию. Остальные
+        запросы выполняет IngredientFilter в базе по триграммному
+        индексу."""
+
+        ingredient_filter = IngredientFilter()
+        name = request.query_params.get(
+            ingredient_filter.search_param, ''
+        ).strip()
+        if not name:
+            ingredients = ingredient_cache.all()
+        else:
+            limit = ingredient_filter.get_limit(request)
+            ingredients = ingredient_cache.search(name, limit=limit)
+            if len(ingredients) < limit:
+                ingredients = self.filter_queryset(self.get_queryset())
+        return Response(self.get_serializer(ingredients, many=True).data)
+
+
+class RecipesViewSet(SerializerProfilingMixin, UserRelationsMixin,
+                     AnonymousResponseCacheMixin, ConditionalRequestMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет рецептов."""
 
     queryset = Recipe.objects.all()
@@ -51,8 +125,96 @@ class RecipesViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthorOrAdminOrReadOnly, ]
     pagination_class = LimitOffsetPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
-    filter_backends = [DjangoFilterBackend, ]
+    filter_backends = [DjangoFilterBackend, RecipeTagFilter]
     filterset_class = RecipeFilter
+    cursor_ordering = ('-create_at', '-id')
+
+    def initial(self, request, *args, **kwargs):
+        """Выбор ключа курсорной пагинации по сортировке из запроса."""
+
+        super().initial(request, *args, **kwargs)
+        ordering = request.query_params.get('ordering')
+        if ordering in RecipeFilter.orderings:
+            self.cursor_ordering = RecipeFilter.orderings[ordering]
+
+    def get_queryset(self):
+        """Метод формирования выборки рецептов для чтения. Для рецепта
+        теги и ингредиенты подгружаются заранее, списки и лента выбираются
+        строками в paginate_queryset. Флаги избранного, списка покупок
+        и подписки на автора берутся из связей пользователя, поэтому
+        количество запросов на страницу не зависит от её размера."""
+
+        queryset = super().get_queryset()
+        if self.action == 'feed':
+            return FeedEntry.objects.get_recipes(self.request.user)
+        if self.action != 'retrieve':
+            return queryset
+        queryset = queryset.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            Prefetch(
+                'recipe',
+                queryset=RecipeIngredientsAmount.objects.select_related(
+                    'ingredient'
+                ).order_by('recipe_id', 'id')
+            ),
+        )
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        """Метод выбора страницы. Страницы списка и ленты выбираются
+        строками values() для RecipeRowSerializer вместе с полями
+        ключа курсорной пагинации."""
+
+        if self.action in ('list', 'feed'):
+            queryset = queryset.values(*dict.fromkeys((
+                *RECIPE_ROW_FIELDS,
+                *(name.lstrip('-') for name in self.cursor_ordering),
+            )))
+        return super().paginate_queryset(queryset)
+
+    def get_content_versions(self, request):
+        """Версии данных, входящих в представление рецепта помимо
+        самого рецепта: теги, ингредиенты, профили и связи пользователя."""
+
+        return (
+            tag_cache.get_version(),
+            ingredient_cache.get_version(),
+            *self.get_user_state(request),
+        )
+
+    def get_list_validators(self, request):
+        """ETag списка по версии списков рецептов, которую меняет любая
+        запись рецепта, его тегов и ингредиентов, профиля автора
+        и популярности, без запросов к базе. Без общего кэша
+        (CACHE_SHARED) смена версии не дошла бы до других воркеров,
+        поэтому условные запросы списка не поддерживаются."""
+
+        if not settings.CACHE_SHARED:
+            return None, None
+        return make_etag(
+            get_cache_version(RECIPES_VERSION_KEY),
+            request.get_full_path(),
+            *self.get_content_versions(request),
+        ), None
+
+    def get_detail_validators(self, request, *args, **kwargs):
+        """ETag и Last-Modified рецепта по дате его изменения.
+        Для некорректного идентификатора проверка пропускается, чтобы
+        get_object ответил 404."""
+
+        try:
+            last_modified = Recipe.objects.filter(
+                pk=kwargs['pk']
+            ).values_list('update_at', flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            return None, None
+        if last_modified is None:
+            return None, None
+        return make_etag(
+            kwargs['pk'],
+            last_modified,
+            *self.get_content_versions(request),
+        ), last_modified
 
     def get_serializer_class(self):
         """Функция выбора сериализатора рецептов
@@ -60,6 +222,8 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
         if self.request.method == 'POST' or self.request.method == 'PATCH':
             return CreateRecipeSerializer
+        if self.action in ('list', 'feed'):
+            return RecipeRowSerializer
         return ReadRecipeSerializer
 
     def perform_create(self, serializer):
@@ -86,6 +250,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save(user=request.user, recipe=recipe)
+            get_user_relations(request).invalidate()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         favorited_recipe = get_object_or_404(
@@ -94,6 +259,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
         favorited_recipe.delete()
+        get_user_relations(request).invalidate()
         response_data = {'message': 'Рецепт удален из избранного.'}
         return Response(response_data, status=status.HTTP_204_NO_CONTENT)
 
@@ -110,6 +276,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 context={'request': request})
             serializer.is_valid(raise_exception=True)
             serializer.save(user=request.user, recipe=recipe)
+            get_user_relations(request).invalidate()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         cart = get_object_or_404(
             ShoppingCart,
@@ -117,6 +284,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
         cart.delete()
+        get_user_relations(request).invalidate()
         response_data = {
             'message': 'Теперь этот рецепт не в списке покупок'
         }
@@ -126,21 +294,50 @@ class RecipesViewSet(viewsets.ModelViewSet):
             detail=False,
             url_name='download_shopping_cart',
             url_path='download_shopping_cart',
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(PlainTextRenderer, CSVRenderer,
+                              FastJSONRenderer))
     def download_shopping_cart(self, request):
-        """Функция выгрузки списка покупок ингредиентов."""
+        """Функция выгрузки списка покупок ингредиентов.
+        Формат файла выбирается параметром ?format=txt|csv|json."""
+
+        return get_shopping_list_file(
+            request,
+            file_format=request.accepted_renderer.format
+        )
 
-        shopping_list_response = get_shopping_list_file(request)
-        if shopping_list_response:
-            return shopping_list_response
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(methods=['get'],
+            detail=False,
+            url_name='feed',
+            url_path='feed',
+            permission_classes=(IsAuthenticated,),
+            cursor_ordering=('-feed_create_at', '-id'))
+    def feed(self, request):
+        """Метод ленты подписок: рецепты всех авторов, на которых
+        подписан пользователь, от новых к старым."""
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class AllUserViewSet(UserViewSet):
+class AllUserViewSet(SerializerProfilingMixin, UserRelationsMixin,
+                     UserViewSet):
     """Вьюсет пользователей."""
 
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
+    pagination_class = UserPagination
+    cursor_ordering = None
+
+    def get_serializer_class(self):
+        """Выбор сериализатора: для страницы подписок - сериализатор
+        подписок, для остальных действий - по настройкам djoser."""
+
+        if self.action == 'subscriptions':
+            return SubscriptionsSerializer
+        return super().get_serializer_class()
 
     @action(detail=True,
             methods=['post', 'delete'],
@@ -158,6 +355,7 @@ class AllUserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save(user=request.user, author=author)
+            get_user_relations(request).invalidate()
             return Response(serializer.data,
                             status=status.HTTP_201_CREATED)
         subscription = get_object_or_404(
@@ -165,21 +363,40 @@ class AllUserViewSet(UserViewSet):
             user=request.user,
             author=author)
         subscription.delete()
+        get_user_relations(request).invalidate()
         response_data = {'detail': 'Вы отписались от автора.'}
         return Response(response_data, status=status.HTTP_204_NO_CONTENT)
 
+    def get_subscription_recipes(self, request):
+        """Выборка рецептов авторов для страницы подписок. Первые
+        recipes_limit рецептов каждого автора отбираются коррелированным
+        подзапросом, поэтому рецепты всех авторов страницы загружаются
+        одним запросом."""
+
+        recipes = Recipe.objects.all()
+        limit = request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            recipes = recipes.filter(pk__in=Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:int(limit)])
+        return recipes
+
     @action(detail=False,
             methods=['get'],
             url_name='subscriptions',
             url_path='subscriptions',
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            cursor_ordering=('-created_at', '-id'))
     def subscriptions(self, request):
         """Метод запроса всех подписок модели пользователя."""
 
-        queryset = Subscription.objects.filter(user=request.user)
+        queryset = Subscription.objects.filter(
+            user=request.user
+        ).select_related('author').prefetch_related(Prefetch(
+            'author__recipe',
+            queryset=self.get_subscription_recipes(request),
+            to_attr='subscription_recipes',
+        ))
         pages = self.paginate_queryset(queryset)
-        serializer = SubscriptionsSerializer(
-            pages,
-            many=True,
-            context={'request': request})
+        serializer = self.get_serializer(pages, many=True)
         return self.get_paginated_response(serializer.data)
@@ -0,0 +1,187 @@
+"""Инструменты нагрузочных замеров API: тестовая база, наполнение
+данными реалистичного объема и подсчет SQL-запросов."""
+
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+
+from core.counters import rebuild_counters
+from recipes.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredientsAmount, ShoppingCart,
+                            ShoppingListIngredient, Tag)
+from recipes.popularity import rebuild_popularity
+from users.models import Subscription, User
+
+# Изображение 1x1 в base64 для создания рецептов через API.
+BENCHMARK_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Верхние границы количества SQL-запросов для маршрутов API. Общие
+# для команды benchmark и тестов tests/test_query_budgets.py.
+QUERY_BUDGETS = {
+    'tags-list': 2,
+    'tags-detail': 1,
+    'ingredients-list': 1,
+    'ingredients-search': 1,
+    'ingredients-detail': 1,
+    'recipes-list': 5,
+    'recipes-list-anonymous': 4,
+    'recipes-list-filtered': 4,
+    'recipes-list-popular': 4,
+    'recipes-feed': 4,
+    'recipes-detail': 4,
+    'recipes-create': 15,
+    'recipes-update': 14,
+    'recipes-favorite-add': 6,
+    'recipes-favorite-remove': 5,
+    'recipes-shopping-cart-add': 9,
+    'recipes-shopping-cart-remove': 7,
+    'recipes-download-shopping-cart': 1,
+    'recipes-delete': 11,
+    'users-list': 3,
+    'users-detail': 2,
+    'users-me': 1,
+    'users-subscriptions': 3,
+    'users-subscribe': 8,
+    'users-unsubscribe': 6,
+    'users-set-password': 2,
+    'token-login': 3,
+    'token-logout': 4,
+}
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Контекстный менеджер отдельной тестовой базы данных.
+    Рабочая база не затрагивается, по выходу тестовая база удаляется."""
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def seed_data(recipes=2000, ingredients=2000, amounts_per_recipe=10,
+              authors=300, tags=10, favorites=100, cart=100,
+              batch_size=1000):
+    """Наполнение базы данными. Возвращает основного пользователя,
+    подписанного на всех авторов и имеющего избранное и список покупок."""
+
+    user = User.objects.create_user(
+        username='benchmark',
+        email='benchmark@foodgram.ru',
+        first_name='Бенчмарк',
+        last_name='Пользователь',
+        password=BENCHMARK_PASSWORD,
+    )
+    User.objects.bulk_create(
+        [User(username=f'author{number}',
+              email=f'author{number}@foodgram.ru',
+              first_name=f'Автор{number}',
+              last_name='Бенчмарк')
+         for number in range(authors)],
+        batch_size=batch_size,
+    )
+    author_ids = list(User.objects.exclude(pk=user.pk).order_by(
+        'pk').values_list('pk', flat=True))
+    Tag.objects.bulk_create(
+        [Tag(name=f'Тег {number}', color='#E26C2D', slug=f'tag{number}')
+         for number in range(tags)]
+    )
+    tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=f'ингредиент {number:05d}', measurement_unit='г')
+         for number in range(ingredients)],
+        batch_size=batch_size,
+    )
+    ingredient_ids = list(Ingredient.objects.order_by('pk').values_list(
+        'pk', flat=True))
+    Recipe.objects.bulk_create(
+        [Recipe(author_id=author_ids[number % authors],
+                name=f'Рецепт {number}',
+                image='meal/images/benchmark.png',
+                text='Описание рецепта',
+                cooking_time=number % 120 + 1)
+         for number in range(recipes)],
+        batch_size=batch_size,
+    )
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+        'pk', flat=True))
+    Recipe.tags.through.objects.bulk_create(
+        [Recipe.tags.through(recipe_id=recipe_id,
+                             tag_id=tag_ids[(number + shift) % tags])
+         for number, recipe_id in enumerate(recipe_ids)
+         for shift in range(min(3, tags))],
+        batch_size=batch_size,
+    )
+    RecipeIngredientsAmount.objects.bulk_create(
+        [RecipeIngredientsAmount(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_ids[
+                (number * amounts_per_recipe + shift) % ingredients
+            ],
+            amount=shift + 1)
+         for number, recipe_id in enumerate(recipe_ids)
+         for shift in range(amounts_per_recipe)],
+        batch_size=batch_size,
+    )
+    Subscription.objects.bulk_create(
+        [Subscription(user=user, author_id=author_id)
+         for author_id in author_ids],
+        batch_size=batch_size,
+    )
+    FavoriteRecipe.objects.bulk_create(
+        [FavoriteRecipe(user=user, recipe_id=recipe_id)
+         for recipe_id in recipe_ids[:favorites]]
+    )
+    ShoppingCart.objects.bulk_create(
+        [ShoppingCart(user=user, recipe_id=recipe_id)
+         for recipe_id in recipe_ids[:cart]]
+    )
+    for recipe_id in recipe_ids[:cart]:
+        ShoppingListIngredient.objects.add_recipe(recipe_id, [user.pk])
+    rebuild_counters()
+    rebuild_popularity()
+    FeedEntry.objects.rebuild()
+    return user
+
+
+def measure(client, method, url, repeat=1, **kwargs):
+    """Выполнение запроса к API. Возвращает последний ответ, наибольшее
+    количество SQL-запросов и медиану времени выполнения в миллисекундах."""
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(context.captured_queries))
+    return response, queries, statistics.median(timings)
+
+
+def percentile(values, percent):
+    """Перцентиль выборки методом ближайшего ранга."""
+
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(index)]
@@ -0,0 +1,70 @@
+"""Денормализованные счетчики: количество добавлений рецепта в избранное,
+количество рецептов и подписчиков пользователя."""
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Subscription, User
+
+
+def change_counter(model, pk, field, delta, skip=None):
+    """Атомарное изменение счетчика выражением F(). Счетчик
+    не уменьшается ниже нуля и, если передан skip, не меняется при
+    значении skip. Возвращает количество измененных строк."""
+
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    if skip is not None:
+        queryset = queryset.exclude(**{field: skip})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_counter_across(model, pk, field, delta, boundary):
+    """Изменение счетчика на 1 или -1 с проверкой перехода через
+    границу: со значения boundary на boundary + 1 или обратно. Переход
+    определяется условием UPDATE без чтения счетчика, поэтому верен при
+    параллельных изменениях; вдали от границы выполняется один запрос.
+    Возвращает True, если счетчик перешел через границу."""
+
+    edge = boundary if delta > 0 else boundary + 1
+    if change_counter(model, pk, field, delta, skip=edge):
+        return False
+    return bool(model.objects.filter(pk=pk, **{field: edge}).update(
+        **{field: edge + delta}
+    ))
+
+
+def count_subquery(model, field):
+    """Подзапрос количества строк модели, ссылающихся на объект."""
+
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+# Счетчики: модель, поле счетчика, модель связи и поле ссылки.
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def rebuild_counters():
+    """Пересчет счетчиков по фактическим данным. Обновляются только
+    расхождения, возвращается количество исправленных строк
+    по каждому счетчику."""
+
+    result = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = count_subquery(related_model, related_field)
+        result[f'{model._meta.label}.{field}'] = model.objects.exclude(
+            **{field: actual}
+        ).update(**{field: actual})
+    return result
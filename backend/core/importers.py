@@ -0,0 +1,171 @@
+"""Потоковый импорт справочника ингредиентов из файлов JSON и CSV.
+Файл читается частями, каждая часть записывается одной операцией:
+COPY во временную таблицу на PostgreSQL или bulk_create на других
+базах. Повторы внутри части отбрасываются до записи, уже существующие
+ингредиенты пропускаются, поэтому повторный импорт безопасен."""
+
+import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+
+READ_SIZE = 64 * 1024
+FIELDS = ('name', 'measurement_unit')
+
+
+def iter_json_records(source):
+    """Чтение объектов из JSON-массива или JSON Lines без загрузки
+    всего файла в память."""
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                break
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                break
+            yield record
+        buffer = buffer[position:]
+        if eof:
+            return
+        chunk = source.read(READ_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_csv_records(source):
+    """Чтение строк CSV вида "название,единица измерения".
+    Строка заголовка с названиями полей пропускается."""
+
+    for row in csv.reader(source):
+        if len(row) < 2 or tuple(row[:2]) == FIELDS:
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+READERS = {
+    'json': iter_json_records,
+    'jsonl': iter_json_records,
+    'csv': iter_csv_records,
+}
+
+
+def clean_records(records, skipped):
+    """Нормализация записей. Записи с пустыми или слишком длинными
+    значениями не импортируются и учитываются в skipped."""
+
+    limits = {
+        field: Ingredient._meta.get_field(field).max_length
+        for field in FIELDS
+    }
+    for record in records:
+        values = tuple(str(record.get(field) or '').strip()
+                       for field in FIELDS)
+        if all(values) and all(
+            len(value) <= limits[field]
+            for field, value in zip(FIELDS, values)
+        ):
+            yield values
+        else:
+            skipped.append(record)
+
+
+def iter_chunks(rows, chunk_size):
+    """Разбиение потока записей на части."""
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_chunk_bulk(chunk):
+    """Запись части через bulk_create с пропуском существующих."""
+
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name, measurement_unit=unit)
+         for name, unit in chunk],
+        ignore_conflicts=True,
+    )
+
+
+def write_chunk_copy(chunk):
+    """Запись части на PostgreSQL: COPY во временную таблицу
+    и вставка из нее с пропуском существующих ингредиентов. Таблица
+    удаляется при фиксации транзакции, а внутри внешней транзакции
+    таблица предыдущей части удаляется перед созданием новой."""
+
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(chunk)
+    buffer.seek(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS ingredient_import')
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_import '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+        cursor.copy_expert(
+            'COPY ingredient_import (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT name, measurement_unit FROM ingredient_import '
+            'ON CONFLICT DO NOTHING'
+        )
+
+
+def get_format(path):
+    """Формат файла по расширению."""
+
+    file_format = Path(path).suffix.lstrip('.').lower()
+    if file_format not in READERS:
+        raise ValueError(
+            f'Неизвестный формат файла {path}, ожидается '
+            + ', '.join(READERS)
+        )
+    return file_format
+
+
+def import_ingredients(path, chunk_size=5000, use_copy=None,
+                       on_chunk=None):
+    """Импорт ингредиентов из файла. on_chunk вызывается после записи
+    каждой части с числом прочитанных записей. Возвращает число
+    прочитанных записей, число повторов внутри частей файла и список
+    пропущенных записей."""
+
+    reader = READERS[get_format(path)]
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    write_chunk = write_chunk_copy if use_copy else write_chunk_bulk
+    skipped = []
+    processed = 0
+    duplicates = 0
+    with open(path, encoding='utf-8', newline='') as source:
+        rows = clean_records(reader(source), skipped)
+        for chunk in iter_chunks(rows, chunk_size):
+            unique = list(dict.fromkeys(chunk))
+            write_chunk(unique)
+            processed += len(chunk)
+            duplicates += len(chunk) - len(unique)
+            if on_chunk is not None:
+                on_chunk(processed)
+    return processed, duplicates, skipped
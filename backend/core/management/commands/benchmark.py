@@ -0,0 +1,161 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import (BENCHMARK_IMAGE, BENCHMARK_PASSWORD,
+                            QUERY_BUDGETS, benchmark_database, measure,
+                            seed_data)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Модель команды замера количества SQL-запросов и времени
+    ответа для всех маршрутов API на наполненной тестовой базе."""
+
+    help = ('Наполняет тестовую базу данными и проверяет количество '
+            'SQL-запросов каждого маршрута API.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: объем данных и число повторов."""
+
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--amounts-per-recipe', type=int, default=10)
+        parser.add_argument('--authors', type=int, default=300)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keepdb', action='store_true')
+
+    @override_settings(CACHE_SHARED=True)
+    def handle(self, *args, **options):
+        """Реализация команды. Замеры идут в одном процессе, поэтому кэш
+        в памяти процесса считается общим и кэши, требующие общего кэша,
+        включены, как в docker-compose."""
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write('Наполнение тестовой базы.')
+            user = seed_data(
+                recipes=options['recipes'],
+                ingredients=options['ingredients'],
+                amounts_per_recipe=options['amounts_per_recipe'],
+                authors=options['authors'],
+            )
+            self.stdout.write('Замеры маршрутов API.')
+            exceeded = self.run_routes(user, options['repeat'])
+        if exceeded:
+            raise CommandError(
+                'Превышен бюджет SQL-запросов: ' + ', '.join(exceeded)
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджеты запросов соблюдены.'))
+
+    def get_routes(self, user):
+        """Список проверяемых маршрутов в порядке выполнения.
+        Маршруты, изменяющие данные, выполняются один раз."""
+
+        recipe = Recipe.objects.exclude(favorites__user=user).first()
+        tag = Tag.objects.first()
+        ingredients = Ingredient.objects.all()[:3]
+        author = User.objects.create_user(
+            username='newauthor',
+            email='newauthor@foodgram.ru',
+            first_name='Новый',
+            last_name='Автор',
+        )
+        payload = {
+            'ingredients': [{'id': ingredient.pk, 'amount': 10}
+                            for ingredient in ingredients],
+            'tags': [tag.pk],
+            'image': BENCHMARK_IMAGE,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+        return [
+            ('tags-list', 'get', '/api/tags/', {}, True),
+            ('tags-detail', 'get', f'/api/tags/{tag.pk}/', {}, True),
+            ('ingredients-list', 'get', '/api/ingredients/', {}, True),
+            ('ingredients-search', 'get', '/api/ingredients/?name=ингр',
+             {}, True),
+            ('ingredients-detail', 'get',
+             f'/api/ingredients/{ingredients[0].pk}/', {}, True),
+            ('recipes-list', 'get', '/api/recipes/', {}, True),
+            ('recipes-list-anonymous', 'get', '/api/recipes/', {}, True),
+            ('recipes-list-filtered', 'get',
+             f'/api/recipes/?tags={tag.slug}&is_favorited=1'
+             '&is_in_shopping_cart=1', {}, True),
+            ('recipes-list-popular', 'get', '/api/recipes/?ordering=popular',
+             {}, True),
+            ('recipes-feed', 'get', '/api/recipes/feed/', {}, True),
+            ('recipes-detail', 'get', f'/api/recipes/{recipe.pk}/', {}, True),
+            ('recipes-create', 'post', '/api/recipes/',
+             {'data': payload, 'format': 'json'}, False),
+            ('recipes-update', 'patch', '/api/recipes/{created}/',
+             {'data': payload, 'format': 'json'}, False),
+            ('recipes-favorite-add', 'post',
+             f'/api/recipes/{recipe.pk}/favorite/', {}, False),
+            ('recipes-favorite-remove', 'delete',
+             f'/api/recipes/{recipe.pk}/favorite/', {}, False),
+            ('recipes-shopping-cart-add', 'post',
+             f'/api/recipes/{recipe.pk}/shopping_cart/', {}, False),
+            ('recipes-shopping-cart-remove', 'delete',
+             f'/api/recipes/{recipe.pk}/shopping_cart/', {}, False),
+            ('recipes-download-shopping-cart', 'get',
+             '/api/recipes/download_shopping_cart/', {}, True),
+            ('recipes-delete', 'delete', '/api/recipes/{created}/', {}, False),
+            ('users-list', 'get', '/api/users/', {}, True),
+            ('users-detail', 'get', f'/api/users/{author.pk}/', {}, True),
+            ('users-me', 'get', '/api/users/me/', {}, True),
+            ('users-subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', {}, True),
+            ('users-subscribe', 'post',
+             f'/api/users/{author.pk}/subscribe/', {}, False),
+            ('users-unsubscribe', 'delete',
+             f'/api/users/{author.pk}/subscribe/', {}, False),
+            ('users-set-password', 'post', '/api/users/set_password/',
+             {'data': {'current_password': BENCHMARK_PASSWORD,
+                       'new_password': BENCHMARK_PASSWORD},
+              'format': 'json'}, False),
+            ('token-login', 'post', '/api/auth/token/login/',
+             {'data': {'email': user.email, 'password': BENCHMARK_PASSWORD},
+              'format': 'json'}, False),
+            ('token-logout', 'post', '/api/auth/token/logout/', {}, False),
+        ]
+
+    def run_routes(self, user, repeat):
+        """Выполнение маршрутов. Возвращает список маршрутов,
+        превысивших бюджет SQL-запросов."""
+
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        anonymous = APIClient()
+        created = None
+        exceeded = []
+        for name, method, url, kwargs, safe in self.get_routes(user):
+            route_client = anonymous if name.endswith('anonymous') else client
+            if name == 'token-login':
+                route_client = anonymous
+            response, queries, duration = measure(
+                route_client,
+                method,
+                url.format(created=created),
+                repeat=repeat if safe else 1,
+                **kwargs
+            )
+            if name == 'recipes-create':
+                created = response.data.get('id')
+            budget = QUERY_BUDGETS[name]
+            status = 'OK' if queries <= budget else 'ПРЕВЫШЕН'
+            self.stdout.write(
+                f'{name:32} {response.status_code} '
+                f'{queries:4}/{budget:<4} {duration:9.2f} мс  {status}'
+            )
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Маршрут {name} вернул {response.status_code}: '
+                    f'{getattr(response, "data", "")}'
+                )
+            if queries > budget:
+                exceeded.append(name)
+        return exceeded
@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core.benchmark import benchmark_database, measure, seed_data
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredientsAmount, ShoppingCart, Tag)
+from users.models import Subscription, User
+
+# Верхние границы количества SQL-запросов страниц админки. Границы
+# списков не зависят от числа строк на странице. На странице рецепта
+# виджет автодополнения выполняет запрос на каждую строку ингредиента,
+# граница рассчитана на AMOUNTS_PER_RECIPE ингредиентов.
+ADMIN_QUERY_BUDGETS = {
+    'tag-changelist': 5,
+    'ingredient-changelist': 4,
+    'recipe-changelist': 6,
+    'recipeingredientsamount-changelist': 5,
+    'shoppingcart-changelist': 6,
+    'favoriterecipe-changelist': 6,
+    'user-changelist': 6,
+    'subscription-changelist': 6,
+    'recipe-change': 20,
+}
+AMOUNTS_PER_RECIPE = 10
+
+# Размеры страниц списков: малая и полная.
+PAGE_SIZES = (10, 100)
+
+
+class Command(BaseCommand):
+    """Модель команды замера количества SQL-запросов страниц админки
+    при разном числе строк на странице."""
+
+    help = ('Наполняет тестовую базу и сравнивает количество SQL-запросов '
+            'списков админки на страницах из 10 и 100 строк.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: объем данных и число повторов."""
+
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    @contextmanager
+    def page_size(self, model, size):
+        """Временное изменение размера страницы списка модели."""
+
+        model_admin = admin.site._registry[model]
+        old_size = model_admin.list_per_page
+        model_admin.list_per_page = size
+        try:
+            yield
+        finally:
+            model_admin.list_per_page = old_size
+
+    def get_pages(self):
+        """Проверяемые страницы: имя, модель и адрес."""
+
+        recipe = Recipe.objects.first()
+        pages = [
+            (f'{model._meta.model_name}-changelist', model,
+             f'/admin/{model._meta.app_label}/{model._meta.model_name}/')
+            for model in (Tag, Ingredient, Recipe, RecipeIngredientsAmount,
+                          ShoppingCart, FavoriteRecipe, User, Subscription)
+        ]
+        pages.append((
+            'recipe-change', None,
+            f'/admin/recipes/recipe/{recipe.pk}/change/',
+        ))
+        return pages
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        with benchmark_database():
+            self.stdout.write('Наполнение тестовой базы.')
+            user = seed_data(
+                recipes=options['recipes'],
+                ingredients=options['ingredients'],
+                amounts_per_recipe=AMOUNTS_PER_RECIPE,
+                authors=options['authors'],
+            )
+            user.is_staff = user.is_superuser = True
+            user.save()
+            client = Client()
+            client.force_login(user)
+            self.stdout.write('Замеры страниц админки.')
+            exceeded = self.run_pages(client, options['repeat'])
+        if exceeded:
+            raise CommandError(
+                'Превышен бюджет SQL-запросов или количество запросов '
+                'зависит от размера страницы: ' + ', '.join(exceeded)
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджеты запросов соблюдены.'))
+
+    def run_pages(self, client, repeat):
+        """Замер страниц на каждом размере страницы. Возвращает список
+        страниц, превысивших бюджет или с числом запросов, растущим
+        вместе с числом строк."""
+
+        sizes = '  '.join(f'{size:>4} строк' for size in PAGE_SIZES)
+        self.stdout.write(f'{"страница":36} {sizes}  бюджет  время, мс')
+        exceeded = []
+        for name, model, url in self.get_pages():
+            counts = []
+            duration = 0
+            for size in PAGE_SIZES if model else PAGE_SIZES[-1:]:
+                if model:
+                    with self.page_size(model, size):
+                        response, queries, duration = measure(
+                            client, 'get', url, repeat=repeat
+                        )
+                else:
+                    response, queries, duration = measure(
+                        client, 'get', url, repeat=repeat
+                    )
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'Страница {name} вернула {response.status_code}'
+                    )
+                counts.append(queries)
+            budget = ADMIN_QUERY_BUDGETS[name]
+            failed = max(counts) > budget or len(set(counts)) > 1
+            cells = '  '.join(f'{count:>9}' for count in counts)
+            self.stdout.write(
+                f'{name:36} {cells:>{11 * len(PAGE_SIZES)}}  {budget:>6}'
+                f'  {duration:9.2f}  {"ПРЕВЫШЕН" if failed else "OK"}'
+            )
+            if failed:
+                exceeded.append(name)
+        return exceeded
@@ -0,0 +1,79 @@
+import json
+import random
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from core.benchmark import benchmark_database, measure, percentile
+from recipes.models import Ingredient
+
+DEFAULT_SOURCE = settings.BASE_DIR / 'core' / 'data' / 'ingredients.json'
+
+
+class Command(BaseCommand):
+    """Модель команды замера задержки автодополнения ингредиентов
+    /api/ingredients/?name= на справочнике ингредиентов."""
+
+    help = ('Замеряет p50/p95/p99 задержки автодополнения ингредиентов '
+            'на отдельной тестовой базе.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: источник данных и число запросов."""
+
+        parser.add_argument('--source', default=str(DEFAULT_SOURCE))
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def get_queries(self, names, count, seed):
+        """Набор запросов, имитирующий ввод с клавиатуры: префиксы
+        длиной 1-4 символа и подстроки из середины названия."""
+
+        generator = random.Random(seed)
+        queries = []
+        while len(queries) < count:
+            name = generator.choice(names)
+            length = generator.randint(1, 4)
+            start = 0
+            if generator.random() >= 0.8:
+                start = generator.randint(0, max(0, len(name) - length))
+            query = name[start:start + length].strip()
+            if query:
+                queries.append(query)
+        return queries
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        with open(options['source'], encoding='utf-8') as raw_data:
+            ingredients = json.load(raw_data)
+        with benchmark_database():
+            Ingredient.objects.bulk_create(
+                [Ingredient(**ingredient) for ingredient in ingredients],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            queries = self.get_queries(
+                [ingredient['name'] for ingredient in ingredients],
+                options['requests'],
+                options['seed'],
+            )
+            client = APIClient()
+            timings = []
+            results = []
+            for query in queries:
+                response, _, duration = measure(
+                    client, 'get', '/api/ingredients/', data={'name': query}
+                )
+                timings.append(duration)
+                results.append(len(response.data))
+        self.stdout.write(
+            f'Ингредиентов: {len(ingredients)}, запросов: {len(queries)}, '
+            f'в среднем результатов: {statistics.mean(results):.1f}'
+        )
+        for percent in (50, 95, 99):
+            self.stdout.write(
+                f'p{percent}: {percentile(timings, percent):.2f} мс'
+            )
+        self.stdout.write(f'max: {max(timings):.2f} мс')
@@ -0,0 +1,155 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.benchmark import benchmark_database, measure, seed_data
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, Tag
+from users.models import User
+
+# Индексы под фильтры RecipeFilter, сравниваемые в замере.
+FILTER_INDEXES = (
+    (FavoriteRecipe, 'favorite_user_idx'),
+    (ShoppingCart, 'shopping_cart_user_idx'),
+    (Recipe, 'recipe_create_at_idx'),
+    (Recipe, 'recipe_author_create_at_idx'),
+)
+
+
+class Command(BaseCommand):
+    """Модель команды замера задержки отфильтрованных списков
+    рецептов без составных индексов и с ними."""
+
+    help = ('Сравнивает задержку списков рецептов с фильтрами RecipeFilter '
+            'до и после создания составных индексов.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: объем данных и число повторов."""
+
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--favorites-per-user', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--explain', action='store_true')
+
+    def seed_activity(self, favorites_per_user):
+        """Избранное и списки покупок всех пользователей из случайных
+        рецептов, чтобы связи основного пользователя были малой долей
+        таблиц и не совпадали с порядком создания рецептов."""
+
+        generator = random.Random(0)
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        sample_size = min(favorites_per_user, len(recipe_ids))
+        for model in (FavoriteRecipe, ShoppingCart):
+            model.objects.bulk_create(
+                [model(user_id=user_id, recipe_id=recipe_id)
+                 for user_id in user_ids
+                 for recipe_id in generator.sample(recipe_ids, sample_size)],
+                batch_size=5000,
+                ignore_conflicts=True,
+            )
+
+    def get_urls(self):
+        """Запросы списка рецептов с фильтрами."""
+
+        author = User.objects.filter(username__startswith='author').first()
+        tag = Tag.objects.first()
+        return (
+            ('без фильтров', '/api/recipes/'),
+            ('страница 100', '/api/recipes/?page=100'),
+            ('автор', f'/api/recipes/?author={author.pk}'),
+            ('тег', f'/api/recipes/?tags={tag.slug}'),
+            ('избранное', '/api/recipes/?is_favorited=1'),
+            ('список покупок', '/api/recipes/?is_in_shopping_cart=1'),
+            ('избранное и покупки',
+             '/api/recipes/?is_favorited=1&is_in_shopping_cart=1'),
+        )
+
+    def analyze(self):
+        """Обновление статистики планировщика."""
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def run_urls(self, client, urls, repeat, explain):
+        """Замер медианы времени ответа по каждому запросу."""
+
+        self.analyze()
+        timings = {}
+        for name, url in urls:
+            _, _, duration = measure(
+                client, 'get', url, repeat=repeat
+            )
+            timings[name] = duration
+            if explain:
+                self.explain(client, url)
+        return timings
+
+    def explain(self, client, url):
+        """Вывод плана самого долгого SQL-запроса маршрута."""
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        query = max(
+            context.captured_queries,
+            key=lambda captured: float(captured['time'])
+        )['sql']
+        with connection.cursor() as cursor:
+            prefix = ('EXPLAIN ANALYZE '
+                      if connection.vendor == 'postgresql'
+                      else 'EXPLAIN QUERY PLAN ')
+            cursor.execute(prefix + query)
+            plan = cursor.fetchall()
+        self.stdout.write(url)
+        for row in plan:
+            self.stdout.write('    ' + ' '.join(str(cell) for cell in row))
+
+    def set_indexes(self, enabled):
+        """Удаление или создание сравниваемых индексов."""
+
+        with connection.schema_editor() as schema_editor:
+            for model, name in FILTER_INDEXES:
+                index = next(index for index in model._meta.indexes
+                             if index.name == name)
+                if enabled:
+                    schema_editor.add_index(model, index)
+                else:
+                    schema_editor.remove_index(model, index)
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        with benchmark_database():
+            self.stdout.write('Наполнение тестовой базы.')
+            user = seed_data(
+                recipes=options['recipes'],
+                ingredients=1000,
+                amounts_per_recipe=5,
+                authors=options['authors'],
+                favorites=0,
+                cart=0,
+            )
+            self.seed_activity(options['favorites_per_user'])
+            client = APIClient()
+            client.force_authenticate(user)
+            urls = self.get_urls()
+
+            self.set_indexes(False)
+            self.stdout.write('Замеры без индексов.')
+            before = self.run_urls(
+                client, urls, options['repeat'], options['explain']
+            )
+            self.set_indexes(True)
+            self.stdout.write('Замеры с индексами.')
+            after = self.run_urls(
+                client, urls, options['repeat'], options['explain']
+            )
+
+        self.stdout.write(f'{"запрос":24} {"до, мс":>10} {"после, мс":>10}')
+        for name, _ in urls:
+            self.stdout.write(
+                f'{name:24} {before[name]:10.2f} {after[name]:10.2f}'
+            )
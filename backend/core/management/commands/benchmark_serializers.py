@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.serializers import (RECIPE_ROW_FIELDS, ReadRecipeSerializer,
+                             RecipeRowSerializer)
+from api.views import RecipesViewSet
+from core.benchmark import benchmark_database, seed_data
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Модель команды замера процессорного времени чтения страницы
+    рецептов сериализаторами моделей и строками values()."""
+
+    help = ('Сравнивает процессорное время на рецепт при чтении страницы '
+            'ReadRecipeSerializer с JSONRenderer и RecipeRowSerializer '
+            'с FastJSONRenderer.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: объем данных, размер страницы и число
+        повторов."""
+
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def get_view(self, user, action):
+        """Вьюсет рецептов с запросом пользователя для контекста
+        сериализаторов."""
+
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return RecipesViewSet(action=action, request=request,
+                              format_kwarg=None)
+
+    def get_paths(self, user, page_size):
+        """Сравниваемые пути чтения: выборка с сериализацией
+        и рендеринг."""
+
+        view = self.get_view(user, 'list')
+        detail_view = self.get_view(user, 'retrieve')
+
+        def serializers_path():
+            recipes = list(detail_view.get_queryset()[:page_size])
+            return ReadRecipeSerializer(
+                recipes, many=True, context=view.get_serializer_context()
+            ).data
+
+        def rows_path():
+            rows = list(
+                Recipe.objects.values(*RECIPE_ROW_FIELDS)[:page_size]
+            )
+            return RecipeRowSerializer(
+                rows, many=True, context=view.get_serializer_context()
+            ).data
+
+        return (
+            ('сериализаторы', serializers_path, JSONRenderer()),
+            ('строки values()', rows_path, FastJSONRenderer()),
+        )
+
+    def measure(self, read, renderer, repeat):
+        """Медианы процессорного времени чтения и рендеринга страницы
+        и результат рендеринга."""
+
+        read_times = []
+        render_times = []
+        content = renderer.render(read())
+        for _ in range(repeat):
+            start = time.process_time()
+            data = read()
+            read_times.append(time.process_time() - start)
+            start = time.process_time()
+            renderer.render(data)
+            render_times.append(time.process_time() - start)
+        return (statistics.median(read_times),
+                statistics.median(render_times), content)
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        with benchmark_database():
+            self.stdout.write('Наполнение тестовой базы.')
+            user = seed_data(
+                recipes=options['recipes'],
+                ingredients=options['ingredients'],
+                authors=options['authors'],
+            )
+            page_size = min(options['page_size'], options['recipes'])
+            self.stdout.write(
+                f'Страница из {page_size} рецептов, '
+                'процессорное время на рецепт, мкс.'
+            )
+            self.stdout.write(
+                f'{"путь":20} {"чтение":>10} {"рендеринг":>10} '
+                f'{"всего":>10}'
+            )
+            results = []
+            for name, read, renderer in self.get_paths(user, page_size):
+                read_time, render_time, content = self.measure(
+                    read, renderer, options['repeat']
+                )
+                total = (read_time + render_time) / page_size * 10 ** 6
+                results.append((total, content))
+                self.stdout.write(
+                    f'{name:20} {read_time / page_size * 10 ** 6:10.1f} '
+                    f'{render_time / page_size * 10 ** 6:10.1f} '
+                    f'{total:10.1f}'
+                )
+        (old_total, old_content), (new_total, new_content) = results
+        if old_content != new_content:
+            raise CommandError(
+                'Ответы сериализаторов и строк values() различаются.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ответы совпадают, ускорение в {old_total / new_total:.1f} раза.'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.images import build_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Модель команды создания уменьшенных копий изображений
+    для рецептов, у которых их еще нет."""
+
+    help = 'Создает уменьшенные копии изображений рецептов.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды: пересоздание копий всех рецептов."""
+
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.exclude(image_variants_of=F('image'))
+        processed = 0
+        for pk, name in recipes.values_list('pk', 'image').iterator():
+            try:
+                build_image_variants(pk, name)
+            except OSError as error:
+                self.stderr.write(f'Рецепт {pk}, {name}: {error}')
+                continue
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано изображений: {processed}')
+        )
@@ -1,26 +1,64 @@
-import json
-from django.core.management.base import BaseCommand
+import time
 
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import import_ingredients
 from recipes.models import Ingredient
+from recipes.reference_cache import ingredient_cache
+
+DEFAULT_SOURCE = settings.BASE_DIR / 'core' / 'data' / 'ingredients.json'
 
 
 class Command(BaseCommand):
     """Модель команды импорта ингридиентов."""
 
+    help = ('Импортирует ингредиенты из файла JSON или CSV. '
+            'Существующие ингредиенты пропускаются.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: путь к файлу, размер части и способ
+        записи."""
+
+        parser.add_argument('path', nargs='?', default=str(DEFAULT_SOURCE))
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Записывать через bulk_create и на PostgreSQL.'
+        )
+
     def handle(self, *args, **options):
         """Реализация команды."""
 
-        with open('core/data/ingredients.json', encoding='utf-8') as raw_data:
-            print('Загрузка данных из файла.')
-            jsondata = json.load(raw_data)
-            print('Данные прочитаны.')
-            print('Началась загрузка ингредиентов.')
-            try:
-                Ingredient.objects.bulk_create(
-                    [Ingredient(**ingredient) for ingredient in jsondata]
-                )
-                print(f'{Ingredient.objects.all().count()} '
-                      'ингрединетов импортировано.')
-                print('Импорт завершен.')
-            except Exception as error_message:
-                raise Exception(error_message)
+        start = time.perf_counter()
+        before = Ingredient.objects.count()
+
+        def report(processed):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'Обработано {processed} записей, '
+                f'{processed / elapsed:.0f} записей/с.'
+            )
+
+        self.stdout.write(f'Импорт ингредиентов из {options["path"]}.')
+        try:
+            processed, duplicates, skipped = import_ingredients(
+                options['path'],
+                chunk_size=options['chunk_size'],
+                use_copy=False if options['no_copy'] else None,
+                on_chunk=report,
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        created = Ingredient.objects.count() - before
+        if created:
+            ingredient_cache.invalidate()
+        elapsed = time.perf_counter() - start
+        for record in skipped[:10]:
+            self.stderr.write(f'Пропущена запись: {record}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершен за {elapsed:.2f} с: обработано {processed}, '
+            f'добавлено {created}, повторов в файле {duplicates}, '
+            f'уже было {processed - duplicates - created}, '
+            f'пропущено {len(skipped)}.'
+        ))
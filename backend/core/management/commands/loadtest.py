@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import percentile
+
+# Читающие маршруты, обслуживаемые асинхронными представлениями.
+READ_ROUTES = (
+    ('recipes-list', '/api/recipes/'),
+    ('recipes-detail', '/api/recipes/{recipe}/'),
+    ('tags-list', '/api/tags/'),
+    ('ingredients-list', '/api/ingredients/?name=а'),
+    ('users-detail', '/api/users/{author}/'),
+)
+
+
+class Command(BaseCommand):
+    """Модель команды нагрузочного теста читающих маршрутов API.
+    Запросы отправляются по HTTP на один или несколько развернутых
+    серверов, например WSGI и ASGI, для сравнения пропускной
+    способности и задержки."""
+
+    help = ('Сравнивает пропускную способность и p50/p99 задержки '
+            'читающих маршрутов API на нескольких серверах.')
+
+    def add_arguments(self, parser):
+        """Аргументы команды: адреса серверов, нагрузка и токен."""
+
+        parser.add_argument(
+            'targets', nargs='+',
+            help='Адреса серверов вида имя=http://host:port.'
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--token', default=None)
+
+    def get_targets(self, targets):
+        """Разбор адресов серверов."""
+
+        result = []
+        for target in targets:
+            name, _, url = target.rpartition('=')
+            result.append((name or url, url.rstrip('/')))
+        return result
+
+    def get_routes(self, session, base_url):
+        """Подстановка существующих рецепта и автора в маршруты."""
+
+        response = session.get(f'{base_url}/api/recipes/?limit=1')
+        response.raise_for_status()
+        results = response.json()['results']
+        if not results:
+            raise CommandError(f'На сервере {base_url} нет рецептов.')
+        recipe = results[0]
+        return [
+            (name, base_url + path.format(
+                recipe=recipe['id'], author=recipe['author']['id']
+            ))
+            for name, path in READ_ROUTES
+        ]
+
+    def load(self, url, headers, count, concurrency):
+        """Отправка count запросов в concurrency потоков. Возвращает
+        число запросов в секунду, задержки и число ошибок."""
+
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            start = time.perf_counter()
+            response = local.session.get(url)
+            return (time.perf_counter() - start) * 1000, response.ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - start
+        timings = [duration for duration, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        return count / elapsed, timings, errors
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        session = requests.Session()
+        session.headers.update(headers)
+        self.stdout.write(
+            f'Запросов на маршрут: {options["requests"]}, '
+            f'параллельно: {options["concurrency"]}'
+        )
+        for target, base_url in self.get_targets(options['targets']):
+            self.stdout.write(f'{target}: {base_url}')
+            for name, url in self.get_routes(session, base_url):
+                throughput, timings, errors = self.load(
+                    url, headers, options['requests'], options['concurrency']
+                )
+                self.stdout.write(
+                    f'  {name:20} {throughput:8.1f} запр/с  '
+                    f'p50 {percentile(timings, 50):8.2f} мс  '
+                    f'p99 {percentile(timings, 99):8.2f} мс  '
+                    f'ошибок {errors}'
+                )
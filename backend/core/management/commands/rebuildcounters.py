@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    """Модель команды пересчета денормализованных счетчиков."""
+
+    help = ('Пересчитывает счетчики избранного, рецептов и подписчиков '
+            'и исправляет расхождения.')
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        for counter, fixed in rebuild_counters().items():
+            self.stdout.write(f'{counter}: исправлено строк {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
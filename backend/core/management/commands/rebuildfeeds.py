@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    """Модель команды пересборки лент подписок пользователей."""
+
+    help = 'Пересобирает ленты подписок по текущим подпискам.'
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        FeedEntry.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'
+        ))
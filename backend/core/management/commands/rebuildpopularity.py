@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import rebuild_popularity
+
+
+class Command(BaseCommand):
+    """Модель команды пересчета популярности рецептов."""
+
+    help = ('Пересчитывает популярность рецептов по активности '
+            'избранного и списков покупок.')
+
+    def handle(self, *args, **options):
+        """Реализация команды."""
+
+        ranked = rebuild_popularity()
+        self.stdout.write(
+            self.style.SUCCESS(f'Популярность пересчитана: {ranked}')
+        )
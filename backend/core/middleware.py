@@ -0,0 +1,141 @@
+import json
+import logging
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.authentication import token_cache
+from core.profiling import (RequestProfile, current_profile,
+                            instrument_connections)
+
+logger = logging.getLogger('core.profiling')
+
+# Модули представлений, для которых проверяются бюджеты запросов.
+BUDGET_VIEW_MODULES = ('api.views',)
+
+
+class QueryBudgetExceeded(Exception):
+    """Превышен бюджет SQL-запросов представления."""
+
+
+class QueryProfilingMiddleware:
+    """Профилирование SQL-запросов каждого запроса. Включается настройкой
+    SQL_PROFILING. Количество и время запросов отдаются в заголовках
+    X-Query-Count и Server-Timing и пишутся в лог одной JSON-строкой.
+    Для представлений api.views проверяется бюджет SQL_QUERY_BUDGETS:
+    при превышении пишется предупреждение или, при
+    SQL_QUERY_BUDGET_ACTION = 'raise', выбрасывается исключение.
+    Время сериализаторов замеряется в представлениях
+    с SerializerProfilingMixin. Потоковые ответы формируются после
+    выхода из middleware, поэтому заголовки им не добавляются,
+    а в логе они отмечаются полем streaming без проверки бюджета.
+    Работает под WSGI и ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Подключение middleware только при включенном профилировании.
+        Под ASGI с асинхронной цепочкой middleware работает как
+        корутина, без перехода в поток для каждого запроса."""
+
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        instrument_connections()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Сбор профиля запроса."""
+
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.process_profile(request, response, profile)
+
+    async def __acall__(self, request):
+        """Сбор профиля запроса под ASGI. Контекст с профилем передается
+        в потоки синхронных представлений и пула асинхронных
+        представлений, запросы к базе из них попадают в профиль."""
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.process_profile(request, response, profile)
+
+    def process_profile(self, request, response, profile):
+        """Заголовки и строка лога профиля, проверка бюджета запросов."""
+
+        total_time = perf_counter() - profile.start
+        budget = self.get_budget(request)
+        if not response.streaming:
+            response['X-Query-Count'] = len(profile.queries)
+            response['Server-Timing'] = ', '.join((
+                f'db;desc="SQL";dur={profile.db_time * 1000:.1f}',
+                f'serializer;dur={profile.serializer_time * 1000:.1f}',
+                f'total;dur={total_time * 1000:.1f}',
+            ))
+            if budget is not None:
+                response['X-Query-Budget'] = budget
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': self.get_view_name(request),
+            'status': response.status_code,
+            'streaming': response.streaming,
+            'queries': len(profile.queries),
+            'budget': budget,
+            'db_ms': round(profile.db_time * 1000, 1),
+            'serializer_ms': round(profile.serializer_time * 1000, 1),
+            'total_ms': round(total_time * 1000, 1),
+            'duplicates': [
+                {'count': count, 'sql': fingerprint}
+                for count, fingerprint in profile.get_duplicates()
+            ],
+            'token_cache': token_cache.get_stats(),
+        }, ensure_ascii=False))
+        if (
+            budget is not None and not response.streaming
+            and len(profile.queries) > budget
+        ):
+            self.budget_exceeded(request, len(profile.queries), budget)
+        return response
+
+    def get_view_name(self, request):
+        """Имя маршрута представления."""
+
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def get_budget(self, request):
+        """Бюджет запросов представления для метода запроса."""
+
+        match = getattr(request, 'resolver_match', None)
+        view_class = getattr(match.func, 'cls', None) if match else None
+        if view_class is None or (
+            view_class.__module__ not in BUDGET_VIEW_MODULES
+        ):
+            return None
+        return settings.SQL_QUERY_BUDGETS.get(
+            match.view_name, {}
+        ).get(request.method)
+
+    def budget_exceeded(self, request, count, budget):
+        """Предупреждение или ошибка при превышении бюджета."""
+
+        message = (f'{request.method} {request.path}: {count} SQL-запросов '
+                   f'при бюджете {budget}')
+        if settings.SQL_QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
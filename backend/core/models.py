@@ -0,0 +1,23 @@
+class CounterFieldsMixin:
+    """Миксин моделей с денормализованными счетчиками. Счетчики
+    меняются только запросами обновления в базе (выражения F(), пересчет),
+    как и поля background_fields, которые заполняют фоновые задачи,
+    поэтому сохранение загруженного объекта не перезаписывает их
+    устаревшими значениями."""
+
+    counter_fields = ()
+    background_fields = ()
+
+    def save(self, *args, **kwargs):
+        """Сохранение существующего объекта без полей счетчиков и полей
+        фоновых задач, если вызывающий код не передал update_fields."""
+
+        excluded = self.counter_fields + self.background_fields
+        if (excluded and not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in excluded
+            ]
+        super().save(*args, **kwargs)
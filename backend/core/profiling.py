@@ -0,0 +1,140 @@
+"""Профилирование запросов: SQL-запросы, их суммарное время, повторяющиеся
+запросы (признак N+1) и время работы сериализаторов. Профиль текущего
+запроса хранится в контекстной переменной, поэтому доступен и в потоках
+пула асинхронных представлений."""
+
+import re
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+current_profile = ContextVar('current_profile', default=None)
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def get_fingerprint(sql):
+    """Нормализованный текст запроса без значений параметров."""
+
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class RequestProfile:
+    """Профиль одного запроса. Экземпляр подключается к соединениям
+    с базой как execute_wrapper и записывает текст и время запросов."""
+
+    def __init__(self):
+        """Инициализация пустого профиля."""
+
+        self.start = perf_counter()
+        self.queries = []
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполнение SQL-запроса с замером времени."""
+
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, perf_counter() - start))
+
+    @property
+    def db_time(self):
+        """Суммарное время SQL-запросов в секундах."""
+
+        return sum(duration for _, duration in self.queries)
+
+    def get_duplicates(self, limit=5):
+        """Повторяющиеся запросы: число повторов и нормализованный
+        текст, самые частые первыми."""
+
+        counter = Counter(get_fingerprint(sql) for sql, _ in self.queries)
+        return [(count, fingerprint)
+                for fingerprint, count in counter.most_common(limit)
+                if count > 1]
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL-запросов соединения: запрос записывается
+    в профиль текущего запроса, если он есть."""
+
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def add_query_recorder(connection, **kwargs):
+    """Подключение записи запросов к соединению с базой."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_connections():
+    """Запись SQL-запросов всех соединений с базой в профиль текущего
+    запроса. Профиль берется из контекстной переменной, поэтому запросы
+    записываются в любом потоке, куда передан контекст запроса:
+    в потоках sync_to_async под ASGI и в пуле асинхронных
+    представлений."""
+
+    connection_created.connect(
+        add_query_recorder, dispatch_uid='core.profiling.record_query'
+    )
+    for connection in connections.all():
+        add_query_recorder(connection)
+
+
+@lru_cache(maxsize=None)
+def get_profiled_serializer(serializer_class):
+    """Подкласс сериализатора с замером времени to_representation.
+    Время вложенных сериализаторов входит во время внешнего и повторно
+    не учитывается."""
+
+    def to_representation(serializer, instance):
+        profile = current_profile.get()
+        if profile is None:
+            return serializer_class.to_representation(serializer, instance)
+        profile.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return serializer_class.to_representation(serializer, instance)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += perf_counter() - start
+
+    return type(serializer_class.__name__, (serializer_class,), {
+        '__module__': serializer_class.__module__,
+        'to_representation': to_representation,
+    })
+
+
+class SerializerProfilingMixin:
+    """Миксин представления для замера времени сериализаторов,
+    полученных через get_serializer. При профилировании запроса класс
+    созданного сериализатора (или списка сериализаторов при many=True)
+    заменяется подклассом с замером времени, без профиля сериализаторы
+    не меняются."""
+
+    def get_serializer(self, *args, **kwargs):
+        """Метод получения сериализатора с замером времени."""
+
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_profile.get() is not None:
+            serializer.__class__ = get_profiled_serializer(type(serializer))
+        return serializer
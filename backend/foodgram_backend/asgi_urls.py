@@ -0,0 +1,35 @@
+"""Маршруты для запуска под ASGI. Читающие эндпоинты рецептов, тегов,
+ингредиентов и пользователей обслуживаются асинхронными представлениями,
+остальные маршруты совпадают с foodgram_backend.urls. Имена маршрутов
+такие же, как у маршрутов роутера."""
+
+from django.urls import re_path
+
+from api.async_views import async_view
+from api.views import (AllUserViewSet, IngridientsViewSet, RecipesViewSet,
+                       TagsViewSet)
+from foodgram_backend.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    re_path(r'^api/recipes/$', async_view(RecipesViewSet.as_view(
+        {'get': 'list', 'post': 'create'},
+        basename='recipes', detail=False,
+    )), name='recipes-list'),
+    re_path(r'^api/recipes/(?P<pk>\d+)/$', async_view(RecipesViewSet.as_view(
+        {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'},
+        basename='recipes', detail=True,
+    )), name='recipes-detail'),
+    re_path(r'^api/tags/$', async_view(TagsViewSet.as_view(
+        {'get': 'list', 'post': 'create'},
+        basename='tags', detail=False,
+    )), name='tags-list'),
+    re_path(r'^api/ingredients/$', async_view(IngridientsViewSet.as_view(
+        {'get': 'list', 'post': 'create'},
+        basename='ingredients', detail=False,
+    )), name='ingredients-list'),
+    re_path(r'^api/users/(?P<id>\d+)/$', async_view(AllUserViewSet.as_view(
+        {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+         'delete': 'destroy'},
+        basename='users', detail=True,
+    )), name='users-detail'),
+] + sync_urlpatterns
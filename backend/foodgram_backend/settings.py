@@ -37,9 +37,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryProfilingMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram_backend.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'foodgram_backend.urls')
 
 TEMPLATES = [
     {
@@ -70,6 +71,27 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+# Кэши в памяти процесса, не общие для воркеров и команд manage.py.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Общий ли кэш для всех процессов. Кэши токенов, связей пользователей
+# и ответов сбрасываются сигналами из любого процесса и включаются только
+# при общем кэше (в docker-compose - memcached).
+CACHE_SHARED = CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,7 +132,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 
     'DEFAULT_PAGINATION_CLASS':
@@ -133,5 +159,105 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
-"""Имя выгружаемого файла."""
+# Имя выгружаемого файла.
 UPLOAD_FILE_NAME = 'shopping_list'
+
+# Количество ингредиентов в выдаче автодополнения по умолчанию и максимум.
+INGREDIENT_AUTOCOMPLETE_LIMIT = 20
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = 100
+
+# Наибольшее время в секундах, в течение которого справочники тегов
+# и ингредиентов в памяти процесса могут отставать от базы, если сброс
+# версии не дошел до процесса.
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 60))
+
+# Кэш пользователей по токенам: размер LRU в памяти процесса и время
+# жизни записей в секундах.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 300
+
+# Время хранения множеств избранного, списка покупок и подписок
+# пользователя в общем кэше в секундах. При 0 или без общего кэша
+# (CACHE_SHARED) множества загружаются в каждом запросе.
+RELATIONS_CACHE_TIMEOUT = 600
+
+# Время хранения готовых ответов списка и страницы рецепта для
+# анонимных пользователей в общем кэше в секундах. При 0 ответы
+# не кэшируются.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Число потоков для работы с базой из асинхронных представлений ASGI.
+ASYNC_DATABASE_THREADS = int(os.getenv('ASYNC_DATABASE_THREADS', 8))
+
+# Ограничения загружаемых изображений рецептов: размер файла в байтах
+# и число пикселей.
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
+# Уменьшенные копии изображений рецептов: формат (WEBP или JPEG),
+# качество, размеры вариантов и число фоновых потоков обработки.
+# При RECIPE_IMAGE_WORKERS = 0 копии создаются после фиксации транзакции
+# в потоке запроса.
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (480, 480),
+    'detail': (1280, 1280),
+}
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+# Популярность рецептов: вес добавления в избранное и в список покупок,
+# период полураспада вклада и окно учитываемой активности в днях.
+POPULARITY_WEIGHTS = {
+    'favorites': 1.0,
+    'shopping_cart': 1.5,
+}
+POPULARITY_HALF_LIFE_DAYS = 7
+POPULARITY_WINDOW_DAYS = 60
+
+# Лента подписок: рецепты авторов с большим числом подписчиков
+# не раскладываются в ленты и читаются при запросе. При подписке в ленту
+# добавляется не больше FEED_BACKFILL_LIMIT последних рецептов автора.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BACKFILL_LIMIT = 100
+
+# Профилирование SQL-запросов: заголовки X-Query-Count и Server-Timing
+# и строка лога на каждый запрос. Бюджеты запросов представлений api.views
+# заданы по имени маршрута и методу и учитывают запрос токена при промахе
+# кэша токенов; при превышении пишется предупреждение (warn) или
+# выбрасывается исключение (raise).
+SQL_PROFILING = os.getenv('SQL_PROFILING', 'False') == 'True'
+SQL_QUERY_BUDGET_ACTION = os.getenv('SQL_QUERY_BUDGET_ACTION', 'warn')
+SQL_QUERY_BUDGETS = {
+    'tags-list': {'GET': 2},
+    'tags-detail': {'GET': 2},
+    'ingredients-list': {'GET': 2},
+    'ingredients-detail': {'GET': 2},
+    'recipes-list': {'GET': 7, 'POST': 17},
+    'recipes-feed': {'GET': 7},
+    'recipes-detail': {'GET': 6, 'PATCH': 16, 'DELETE': 12},
+    'recipes-favorite': {'POST': 8, 'DELETE': 7},
+    'recipes-shopping_cart': {'POST': 11, 'DELETE': 9},
+    'recipes-download_shopping_cart': {'GET': 3},
+    'users-list': {'GET': 14},
+    'users-detail': {'GET': 4},
+    'users-me': {'GET': 3},
+    'users-subscriptions': {'GET': 5},
+    'users-subscribe': {'POST': 10, 'DELETE': 8},
+    'users-set-password': {'POST': 4},
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
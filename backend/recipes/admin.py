@@ -13,6 +13,7 @@ class TagAdmin(admin.ModelAdmin):
         'color',
         'slug',
     )
+    search_fields = ('name', 'slug')
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -23,18 +24,29 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit',
     )
-    list_filter = ('name',)
     search_fields = ('name',)
+    show_full_result_count = False
 
 
 class RecipeIngredients(admin.TabularInline):
     """Ингредиенты для отображения в админке рецептов инлайн."""
 
     model = RecipeIngredientsAmount
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        """Выборка строк с ингредиентом и рецептом для их
+        строкового отображения."""
+
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    """Модель админки рецептов."""
+    """Модель админки рецептов. Ингредиенты рецептов страницы
+    загружаются одним запросом, количество добавлений в избранное
+    хранится в счетчике."""
 
     inlines = [RecipeIngredients, ]
     list_display = (
@@ -49,8 +61,9 @@ class RecipeAdmin(admin.ModelAdmin):
         'added_to_favorites',
     )
     readonly_fields = ('recipe_ingredients', 'added_to_favorites',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
     list_filter = (
-        'name',
         'tags',
         'create_at',
     )
@@ -63,20 +76,27 @@ class RecipeAdmin(admin.ModelAdmin):
         'tags__name',
         'tags__slug',
     )
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Выборка рецептов с ингредиентами."""
+
+        return super().get_queryset(request).prefetch_related(
+            'ingredients'
+        )
 
     def added_to_favorites(self, recipe):
         """Метод отображения количества добавлений рецептов в избранное."""
 
-        return FavoriteRecipe.objects.filter(recipe=recipe).count()
+        return recipe.favorites_count
     added_to_favorites.short_description = 'Добавлено в избранное раз'
 
     def recipe_ingredients(self, recipe):
         """Метод отображения ингредиентов в админке рецепта."""
 
-        ingredient_list = []
-        for ingredient in recipe.ingredients.all():
-            ingredient_list.append(ingredient)
-        return ingredient_list
+        return ', '.join(
+            ingredient.name for ingredient in recipe.ingredients.all()
+        )
     recipe_ingredients.short_description = 'Ингредиенты'
 
 
@@ -90,7 +110,10 @@ class RecipeIngredientsAmountAdmin(admin.ModelAdmin):
         'ingredient',
         'amount',
     )
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
     list_filter = ('recipe__tags', 'recipe__create_at')
+    show_full_result_count = False
 
 
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -102,6 +125,8 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
         'create_at'
     )
+    list_select_related = ('recipe', 'user')
+    autocomplete_fields = ('recipe', 'user')
     list_filter = (
         'recipe__tags',
         'recipe__create_at',
@@ -124,8 +149,9 @@ class FavoriteRecipeAdmin(admin.ModelAdmin):
         'user',
         'create_at',
     )
+    list_select_related = ('recipe', 'user')
+    autocomplete_fields = ('recipe', 'user')
     list_filter = (
-        'user',
         'recipe__tags',
         'recipe__create_at',
     )
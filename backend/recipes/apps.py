@@ -6,3 +6,8 @@ class RecipesConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        """Подключение сигналов приложения."""
+
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,147 @@
+"""Обработка изображений рецептов: уменьшенные копии для списков
+и детального просмотра создаются в фоновом пуле потоков после
+сохранения рецепта и удаляются при замене изображения и удалении
+рецепта."""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Пул потоков обработки изображений. Отсутствует при
+# RECIPE_IMAGE_WORKERS = 0.
+image_executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+) if settings.RECIPE_IMAGE_WORKERS else None
+
+# Сигнал готовности уменьшенных копий изображения рецепта. Отправляется
+# с аргументом recipe_id после обновления рецепта запросом update,
+# при котором сигналы моделей не вызываются.
+image_variants_built = Signal()
+
+
+def get_variant_name(name, variant):
+    """Имя файла уменьшенной копии изображения."""
+
+    directory, filename = os.path.split(name)
+    extension = settings.RECIPE_IMAGE_FORMAT.lower()
+    return os.path.join(
+        directory,
+        'variants',
+        f'{os.path.splitext(filename)[0]}_{variant}.{extension}',
+    )
+
+
+def get_image_url(recipe, variant):
+    """Адрес изображения рецепта нужного размера. Пока копии
+    не созданы, возвращается адрес исходного изображения."""
+
+    return get_image_url_by_name(
+        recipe.image.name, recipe.image_variants_of, variant
+    )
+
+
+def get_image_url_by_name(name, variants_of, variant):
+    """Адрес изображения по имени файла и полю image_variants_of
+    для строк рецептов, выбранных без создания моделей."""
+
+    if not name:
+        return None
+    if variant and variants_of == name:
+        return default_storage.url(get_variant_name(name, variant))
+    return default_storage.url(name)
+
+
+def build_image_variants(recipe_id, name):
+    """Создание уменьшенных копий изображения. Рецепт помечается
+    готовым, только если за это время изображение не сменилось."""
+
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(
+            buffer, image_format, quality=settings.RECIPE_IMAGE_QUALITY
+        )
+        variant_name = get_variant_name(name, variant)
+        default_storage.delete(variant_name)
+        default_storage.save(variant_name, ContentFile(buffer.getvalue()))
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants_of=name, update_at=timezone.now()
+    )
+    if updated:
+        image_variants_built.send(sender=Recipe, recipe_id=recipe_id)
+    else:
+        delete_image_variants(name)
+
+
+def delete_image_variants(name):
+    """Удаление уменьшенных копий изображения."""
+
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        default_storage.delete(get_variant_name(name, variant))
+
+
+def run_image_task(recipe_id, name):
+    """Выполнение обработки в фоновом потоке. Ошибки записываются
+    в журнал, рецепт продолжает отдавать исходное изображение."""
+
+    try:
+        build_image_variants(recipe_id, name)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение %s рецепта %s',
+            name, recipe_id,
+        )
+    finally:
+        connection.close()
+
+
+def submit_image_variants(recipe_id, name):
+    """Постановка обработки изображения в очередь пула."""
+
+    if image_executor is None:
+        build_image_variants(recipe_id, name)
+    else:
+        image_executor.submit(run_image_task, recipe_id, name)
+
+
+def schedule_image_variants(recipe):
+    """Обработка изображения рецепта после фиксации транзакции,
+    если копии для текущего изображения еще не созданы."""
+
+    if recipe.image and recipe.image_variants_of != recipe.image.name:
+        transaction.on_commit(
+            partial(submit_image_variants, recipe.pk, recipe.image.name)
+        )
+
+
+def schedule_image_variants_delete(name):
+    """Удаление уменьшенных копий изображения после фиксации
+    транзакции."""
+
+    if name:
+        transaction.on_commit(partial(delete_image_variants, name))
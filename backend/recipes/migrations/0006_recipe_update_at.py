@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def fill_update_at(apps, schema_editor):
+    """Дата изменения существующих рецептов равна дате создания."""
+
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(update_at=F('create_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='update_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_update_at, migrations.RunPython.noop),
+    ]
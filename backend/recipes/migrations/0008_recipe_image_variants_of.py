@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_of',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Изображение с готовыми уменьшенными копиями'),
+        ),
+    ]
@@ -1,8 +1,12 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Case, F, Value, When
 
+from core.models import CounterFieldsMixin
 from foodgram_backend import model_settings as set
-from users.models import User
+from users.models import Subscription, User
 
 
 class Tag(models.Model):
@@ -83,9 +87,12 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель рецепта."""
 
+    counter_fields = ('favorites_count', 'popularity')
+    background_fields = ('image_variants_of',)
+
     tags = models.ManyToManyField(
         Tag,
         related_name='recipe',
@@ -119,6 +126,12 @@ class Recipe(models.Model):
         blank=False,
         help_text='Добавьте изображение готового блюда',
     )
+    image_variants_of = models.CharField(
+        'Изображение с готовыми уменьшенными копиями',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         'Описание рецепта',
         max_length=set.RECIPE_TEXT_LENGTH,
@@ -138,11 +151,37 @@ class Recipe(models.Model):
         help_text='Укажите время приготовления в минутах',
     )
     create_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    update_at = models.DateTimeField('Дата изменения', auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        'Добавлено в избранное раз',
+        default=0,
+        editable=False,
+    )
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False,
+        help_text='Пересчитывается командой rebuildpopularity',
+    )
 
     class Meta:
         """Мета настройки отображения модели рецепта."""
 
-        ordering = ['-create_at']
+        ordering = ['-create_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['-create_at', '-id'],
+                name='recipe_create_at_idx',
+            ),
+            models.Index(
+                fields=['author', '-create_at', '-id'],
+                name='recipe_author_create_at_idx',
+            ),
+            models.Index(
+                fields=['-popularity', '-id'],
+                name='recipe_popularity_idx',
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -231,6 +270,12 @@ class ShoppingCart(models.Model):
                 name='unique_recipes',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'],
+                name='shopping_cart_user_idx',
+            ),
+        ]
         ordering = ['-create_at']
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
@@ -271,6 +316,12 @@ class FavoriteRecipe(models.Model):
                 name='unique_favorite',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'],
+                name='favorite_user_idx',
+            ),
+        ]
         ordering = ['-create_at']
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -279,3 +330,290 @@ class FavoriteRecipe(models.Model):
         """Строковое отображения избранного."""
 
         return f'Рецепт "{self.recipe}" в избранном у {self.user}'
+
+
+class ShoppingListManager(models.Manager):
+    """Менеджер агрегированного списка покупок. Изменяет суммы
+    ингредиентов пользователей при добавлении или удалении рецепта."""
+
+    def apply_amounts(self, amounts, user_ids):
+        """Метод изменения сумм ингредиентов в списках покупок
+        пользователей на величины amounts: словарь id ингредиента
+        и изменения количества."""
+
+        user_ids = list(user_ids)
+        amounts = {ingredient_id: amount
+                   for ingredient_id, amount in amounts.items() if amount}
+        if not user_ids or not amounts:
+            return
+        rows = self.filter(user_id__in=user_ids, ingredient_id__in=amounts)
+        added = [ingredient_id for ingredient_id, amount in amounts.items()
+                 if amount > 0]
+        if added:
+            self.bulk_create(
+                [self.model(user_id=user_id, ingredient_id=ingredient_id,
+                            amount=0)
+                 for user_id in user_ids for ingredient_id in added],
+                ignore_conflicts=True,
+            )
+        rows.update(amount=F('amount') + Case(
+            *[When(ingredient_id=ingredient_id, then=Value(amount))
+              for ingredient_id, amount in amounts.items()],
+            output_field=models.IntegerField(),
+        ))
+        if len(added) < len(amounts):
+            rows.filter(amount__lte=0).delete()
+
+    def apply_recipe(self, recipe_id, user_ids, sign=1):
+        """Метод добавления (sign=1) или вычитания (sign=-1) количеств
+        ингредиентов рецепта из списков покупок пользователей."""
+
+        amounts = RecipeIngredientsAmount.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', 'amount')
+        self.apply_amounts(
+            {ingredient_id: sign * amount
+             for ingredient_id, amount in amounts},
+            user_ids,
+        )
+
+    def add_recipe(self, recipe_id, user_ids):
+        """Метод добавления рецепта в списки покупок пользователей."""
+
+        self.apply_recipe(recipe_id, user_ids, sign=1)
+
+    def remove_recipe(self, recipe_id, user_ids):
+        """Метод удаления рецепта из списков покупок пользователей."""
+
+        self.apply_recipe(recipe_id, user_ids, sign=-1)
+
+
+class ShoppingListIngredient(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок.
+    Хранит готовый к выгрузке список, поддерживается при изменении
+    списка покупок и ингредиентов рецептов."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Покупатель',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField('Суммарное количество ингредиента')
+
+    objects = ShoppingListManager()
+
+    class Meta:
+        """Мета настройки модели и проверка уникальности
+        ингредиента в списке покупок пользователя."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient',
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+    def __str__(self):
+        """Строковое отображение ингредиента в списке покупок."""
+
+        return f'{self.ingredient} - {self.amount} у {self.user}'
+
+
+# Ключ общего кэша с множеством авторов, рецепты которых читаются
+# напрямую при запросе ленты.
+DIRECT_AUTHORS_KEY = 'feed:direct_authors'
+
+
+class FeedManager(models.Manager):
+    """Менеджер ленты подписок. Рецепты автора раскладываются в ленты
+    подписчиков при публикации. Рецепты авторов, у которых больше
+    FEED_FANOUT_MAX_FOLLOWERS подписчиков, в ленты не раскладываются
+    и читаются напрямую при запросе ленты. Множество таких авторов
+    хранится в кэше и сбрасывается при переходе счетчика подписчиков
+    через порог; когда автор опускается до порога, его рецепты заранее
+    раскладываются в ленты всех подписчиков."""
+
+    def get_direct_author_ids(self):
+        """Метод получения множества авторов, рецепты которых
+        не раскладываются в ленты. Без общего кэша (CACHE_SHARED)
+        множество перечитывается не реже чем раз
+        в REFERENCE_CACHE_TTL секунд."""
+
+        return cache.get_or_set(
+            DIRECT_AUTHORS_KEY,
+            lambda: frozenset(User.objects.filter(
+                followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+            ).values_list('pk', flat=True)),
+            timeout=(None if settings.CACHE_SHARED
+                     else settings.REFERENCE_CACHE_TTL),
+        )
+
+    def reset_direct_author_ids(self):
+        """Метод сброса множества авторов без раскладки в ленты."""
+
+        cache.delete(DIRECT_AUTHORS_KEY)
+
+    def is_fanout_author(self, author_id):
+        """Метод проверки, раскладываются ли рецепты автора в ленты."""
+
+        return author_id not in self.get_direct_author_ids()
+
+    def add_recipe(self, recipe, batch_size=1000):
+        """Метод добавления рецепта в ленты подписчиков автора."""
+
+        if not self.is_fanout_author(recipe.author_id):
+            return
+        user_ids = Subscription.objects.filter(
+            author_id=recipe.author_id
+        ).values_list('user_id', flat=True)
+        self.bulk_create(
+            [self.model(user_id=user_id, recipe_id=recipe.pk,
+                        author_id=recipe.author_id,
+                        create_at=recipe.create_at)
+             for user_id in user_ids.iterator()],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+    def get_backfill_recipes(self, author_id):
+        """Метод выборки последних рецептов автора для ленты."""
+
+        return list(Recipe.objects.filter(author_id=author_id).values_list(
+            'pk', 'create_at'
+        )[:settings.FEED_BACKFILL_LIMIT])
+
+    def add_author(self, user_id, author):
+        """Метод добавления последних рецептов автора в ленту
+        пользователя при подписке."""
+
+        if not self.is_fanout_author(author.pk):
+            return
+        self.bulk_create(
+            [self.model(user_id=user_id, recipe_id=recipe_id,
+                        author_id=author.pk, create_at=create_at)
+             for recipe_id, create_at in self.get_backfill_recipes(author.pk)],
+            ignore_conflicts=True,
+        )
+
+    def add_followers(self, author_id, batch_size=1000):
+        """Метод добавления последних рецептов автора в ленты всех его
+        подписчиков, когда его рецепты снова раскладываются в ленты.
+        Множество авторов без раскладки сбрасывается после заполнения
+        лент, поэтому рецепты автора не пропадают из лент."""
+
+        recipes = self.get_backfill_recipes(author_id)
+        user_ids = Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True) if recipes else []
+        entries = []
+        for user_id in user_ids:
+            entries.extend(
+                self.model(user_id=user_id, recipe_id=recipe_id,
+                           author_id=author_id, create_at=create_at)
+                for recipe_id, create_at in recipes
+            )
+            if len(entries) >= batch_size:
+                self.bulk_create(entries, ignore_conflicts=True)
+                entries = []
+        self.bulk_create(entries, ignore_conflicts=True)
+        self.reset_direct_author_ids()
+
+    def remove_author(self, user_id, author_id):
+        """Метод удаления рецептов автора из ленты пользователя."""
+
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def rebuild(self):
+        """Метод пересборки всех лент по текущим подпискам."""
+
+        self.all().delete()
+        self.reset_direct_author_ids()
+        subscriptions = Subscription.objects.select_related('author')
+        for subscription in subscriptions.iterator():
+            self.add_author(subscription.user_id, subscription.author)
+
+    def get_recipes(self, user):
+        """Метод выборки рецептов ленты пользователя: рецепты из готовой
+        ленты и рецепты авторов, которые не раскладываются в ленты.
+        Рецепты упорядочены по полю feed_create_at. Подписки на таких
+        авторов проверяются только если они есть, иначе лента читается
+        по индексу записей ленты пользователя."""
+
+        direct_author_ids = self.get_direct_author_ids()
+        if direct_author_ids:
+            direct_author_ids = list(Subscription.objects.filter(
+                user=user, author_id__in=direct_author_ids
+            ).values_list('author_id', flat=True))
+        if not direct_author_ids:
+            recipes = Recipe.objects.filter(feed_entries__user=user).annotate(
+                feed_create_at=models.F('feed_entries__create_at')
+            )
+        else:
+            recipes = Recipe.objects.filter(
+                models.Q(pk__in=self.filter(user=user).values('recipe_id'))
+                | models.Q(author_id__in=direct_author_ids)
+            ).annotate(feed_create_at=models.F('create_at'))
+        return recipes.order_by('-feed_create_at', '-id')
+
+
+class FeedEntry(models.Model):
+    """Модель записи ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта',
+    )
+    create_at = models.DateTimeField('Дата создания рецепта')
+
+    objects = FeedManager()
+
+    class Meta:
+        """Мета настройки модели, проверка уникальности рецепта
+        в ленте пользователя и индекс чтения ленты."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-create_at'],
+                name='feed_entry_user_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_entry_author_idx',
+            ),
+        ]
+        ordering = ['-create_at']
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        """Строковое отображение записи ленты."""
+
+        return f'{self.recipe} в ленте {self.user}'
@@ -0,0 +1,96 @@
+"""Популярность рецептов: сумма добавлений в избранное и в список
+покупок, вклад которых затухает со временем."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Exists, FloatField, Func, OuterRef, Q,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Power
+from django.dispatch import Signal
+from django.utils import timezone
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+# Сигнал пересчета популярности: она сохраняется запросами update,
+# при которых сигналы моделей не вызываются.
+popularity_rebuilt = Signal()
+
+# Модели активности и ключи их весов в POPULARITY_WEIGHTS.
+ACTIVITY_MODELS = (
+    (FavoriteRecipe, 'favorites'),
+    (ShoppingCart, 'shopping_cart'),
+)
+
+
+class Epoch(Func):
+    """Время в секундах от начала эпохи Unix."""
+
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        """Время в секундах для SQLite через юлианскую дату."""
+
+        return self.as_sql(
+            compiler, connection,
+            template='((JULIANDAY(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context
+        )
+
+
+def activity_score(model, weight, since, now):
+    """Подзапрос вклада активности модели в популярность рецепта:
+    вклад каждого добавления уменьшается вдвое за
+    POPULARITY_HALF_LIFE_DAYS."""
+
+    half_life = timedelta(
+        days=settings.POPULARITY_HALF_LIFE_DAYS
+    ).total_seconds()
+    decay = Power(
+        Value(0.5),
+        (Value(now.timestamp()) - Epoch('create_at')) / Value(half_life),
+        output_field=FloatField(),
+    )
+    return Coalesce(Subquery(
+        model.objects.filter(
+            recipe_id=OuterRef('pk'), create_at__gte=since
+        ).order_by().values('recipe_id').annotate(
+            score=Sum(decay * Value(float(weight)))
+        ).values('score')
+    ), Value(0.0))
+
+
+def popularity_expression(now=None):
+    """Выражение популярности рецепта по активности за окно
+    POPULARITY_WINDOW_DAYS и условие отбора рецептов с активностью
+    в окне."""
+
+    now = now or timezone.now()
+    since = now - timedelta(days=settings.POPULARITY_WINDOW_DAYS)
+    score = Value(0.0)
+    active = Q()
+    for model, weight_key in ACTIVITY_MODELS:
+        score = score + activity_score(
+            model, settings.POPULARITY_WEIGHTS[weight_key], since, now
+        )
+        active |= Q(Exists(model.objects.filter(
+            recipe_id=OuterRef('pk'), create_at__gte=since
+        )))
+    return score, active
+
+
+def rebuild_popularity(now=None):
+    """Пересчет популярности рецептов одним запросом UPDATE
+    с подзапросами по активности. Обновляются рецепты с активностью
+    в окне и рецепты, популярность которых нужно обнулить. Возвращает
+    количество обновленных рецептов."""
+
+    score, active = popularity_expression(now)
+    with transaction.atomic():
+        updated = Recipe.objects.filter(
+            active | Q(popularity__gt=0)
+        ).update(popularity=score)
+    popularity_rebuilt.send(sender=Recipe)
+    return updated
@@ -0,0 +1,158 @@
+from bisect import bisect_left
+from collections import namedtuple
+from hashlib import md5
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Ingredient, Tag
+
+TagRecord = namedtuple('TagRecord', ('id', 'name', 'color', 'slug'))
+IngredientRecord = namedtuple(
+    'IngredientRecord', ('id', 'name', 'measurement_unit')
+)
+
+
+# Снимок справочника: записи и индексы по ним. Заменяется целиком
+# одним присваиванием, поэтому потоки всегда читают согласованные данные.
+Snapshot = namedtuple('Snapshot', (
+    'shared_version', 'version', 'expires', 'records', 'by_id', 'by_field',
+    'search_keys',
+))
+
+
+class ReferenceCache:
+    """Кэш справочных данных в памяти процесса. Записи загружаются из
+    базы один раз и хранятся в виде неизменяемых кортежей. Актуальность
+    проверяется по версии в кэше CACHES, которую меняют сигналы изменения
+    модели; сброс виден другим процессам только при общем кэше
+    (CACHE_SHARED). Независимо от версии записи перечитываются не реже
+    чем раз в REFERENCE_CACHE_TTL секунд."""
+
+    def __init__(self, model, record_class):
+        """Инициализация кэша модели и класса записей."""
+
+        self.model = model
+        self.record_class = record_class
+        self.version_key = f'reference:{model._meta.label_lower}:version'
+        self._snapshot = None
+
+    def get_shared_version(self):
+        """Метод получения версии из кэша CACHES. Версия случайная,
+        чтобы вытеснение ключа тоже приводило к перезагрузке."""
+
+        return cache.get_or_set(
+            self.version_key, lambda: uuid4().hex, timeout=None
+        )
+
+    def get_version(self):
+        """Метод получения версии данных: хэша загруженных записей.
+        Одинаковые данные дают одинаковую версию во всех процессах."""
+
+        return self.get_snapshot().version
+
+    def load(self, shared_version):
+        """Метод загрузки записей из базы данных в новый снимок."""
+
+        records = tuple(
+            self.record_class(*row) for row in self.model.objects.values_list(
+                *self.record_class._fields
+            )
+        )
+        snapshot = Snapshot(
+            shared_version=shared_version,
+            version=md5(repr(records).encode()).hexdigest(),
+            expires=monotonic() + settings.REFERENCE_CACHE_TTL,
+            records=records,
+            by_id={record.id: record for record in records},
+            by_field={},
+            search_keys=tuple(sorted(
+                (record.name.lower(), position)
+                for position, record in enumerate(records)
+            )),
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def get_snapshot(self):
+        """Метод получения актуального снимка."""
+
+        snapshot = self._snapshot
+        shared_version = self.get_shared_version()
+        if (
+            snapshot is None
+            or snapshot.shared_version != shared_version
+            or snapshot.expires <= monotonic()
+        ):
+            snapshot = self.load(shared_version)
+        return snapshot
+
+    def all(self):
+        """Метод получения всех записей в порядке сортировки модели."""
+
+        return self.get_snapshot().records
+
+    def get_many(self, ids):
+        """Метод получения записей по списку идентификаторов.
+        Идентификаторы, которых нет в снимке, дочитываются из базы одним
+        запросом: если они нашлись, снимок отстал от базы и будет
+        перечитан при следующем обращении."""
+
+        ids = list(ids)
+        by_id = self.get_snapshot().by_id
+        missing = {pk for pk in ids if pk not in by_id}
+        loaded = {}
+        if missing:
+            loaded = {
+                row[0]: self.record_class(*row)
+                for row in self.model.objects.filter(
+                    pk__in=missing
+                ).values_list(*self.record_class._fields)
+            }
+            if loaded:
+                self._snapshot = None
+        return [
+            by_id[pk] if pk in by_id else loaded[pk]
+            for pk in ids if pk in by_id or pk in loaded
+        ]
+
+    def get_by(self, field, values):
+        """Метод получения записей по значениям поля, например тегов
+        по slug. Словарь по полю строится при первом обращении."""
+
+        snapshot = self.get_snapshot()
+        index = snapshot.by_field.get(field)
+        if index is None:
+            index = {getattr(record, field): record
+                     for record in snapshot.records}
+            snapshot.by_field[field] = index
+        return [index[value] for value in values if value in index]
+
+    def search(self, name, limit=None):
+        """Метод поиска записей по началу названия без учета регистра
+        в порядке сортировки модели. Поиск по подстроке в середине
+        названия выполняется в базе."""
+
+        snapshot = self.get_snapshot()
+        name = name.lower()
+        keys = snapshot.search_keys
+        positions = []
+        index = bisect_left(keys, (name, -1))
+        while index < len(keys) and keys[index][0].startswith(name):
+            positions.append(keys[index][1])
+            index += 1
+        found = [snapshot.records[position] for position in sorted(positions)]
+        return found if limit is None else found[:limit]
+
+    def invalidate(self):
+        """Метод сброса кэша в текущем процессе и, при общем кэше,
+        во всех процессах."""
+
+        cache.set(self.version_key, uuid4().hex, timeout=None)
+        self._snapshot = None
+
+
+tag_cache = ReferenceCache(Tag, TagRecord)
+ingredient_cache = ReferenceCache(Ingredient, IngredientRecord)
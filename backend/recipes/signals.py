@@ -0,0 +1,131 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.counters import change_counter
+from recipes.images import (schedule_image_variants,
+                            schedule_image_variants_delete)
+from recipes.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListIngredient, Tag)
+from users.models import Subscription, User
+from users.signals import fanout_threshold_crossed
+from recipes.reference_cache import ingredient_cache, tag_cache
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    """Добавление ингредиентов рецепта в список покупок пользователя."""
+
+    if created:
+        ShoppingListIngredient.objects.add_recipe(
+            instance.recipe_id, [instance.user_id]
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    """Вычитание ингредиентов рецепта из списка покупок пользователя.
+    Выполняется до удаления, пока ингредиенты рецепта еще существуют,
+    в том числе при каскадном удалении рецепта."""
+
+    ShoppingListIngredient.objects.remove_recipe(
+        instance.recipe_id, [instance.user_id]
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_variants(sender, instance, **kwargs):
+    """Создание уменьшенных копий нового изображения рецепта. Копии
+    замененного изображения удаляются: поле image_variants_of хранит
+    имя изображения, для которого они созданы."""
+
+    if instance.image_variants_of != instance.image.name:
+        schedule_image_variants_delete(instance.image_variants_of)
+    schedule_image_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image_variants(sender, instance, **kwargs):
+    """Удаление уменьшенных копий изображения удаленного рецепта."""
+
+    schedule_image_variants_delete(instance.image_variants_of)
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(sender, instance, created, **kwargs):
+    """Увеличение счетчика рецептов автора."""
+
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(sender, instance, created, **kwargs):
+    """Добавление нового рецепта в ленты подписчиков автора."""
+
+    if created:
+        FeedEntry.objects.add_recipe(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    """Добавление рецептов автора в ленту нового подписчика."""
+
+    if created:
+        FeedEntry.objects.add_author(instance.user_id, instance.author)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_author_from_feed(sender, instance, **kwargs):
+    """Удаление рецептов автора из ленты бывшего подписчика."""
+
+    FeedEntry.objects.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(fanout_threshold_crossed)
+def update_author_fanout(sender, author_id, fanout, **kwargs):
+    """Переход автора через порог раскладки рецептов в ленты: рецепты
+    автора, который снова раскладывается в ленты, добавляются в ленты
+    его подписчиков."""
+
+    if fanout:
+        FeedEntry.objects.add_followers(author_id)
+    else:
+        FeedEntry.objects.reset_direct_author_ids()
+
+
+@receiver(post_delete, sender=Recipe)
+def decrease_recipes_count(sender, instance, **kwargs):
+    """Уменьшение счетчика рецептов автора."""
+
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def increase_favorites_count(sender, instance, created, **kwargs):
+    """Увеличение счетчика добавлений рецепта в избранное."""
+
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def decrease_favorites_count(sender, instance, **kwargs):
+    """Уменьшение счетчика добавлений рецепта в избранное."""
+
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cache(sender, **kwargs):
+    """Сброс справочного кэша тегов при изменении тега."""
+
+    tag_cache.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_cache(sender, **kwargs):
+    """Сброс справочного кэша ингредиентов при изменении ингредиента."""
+
+    ingredient_cache.invalidate()
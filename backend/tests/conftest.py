@@ -0,0 +1,159 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import BENCHMARK_IMAGE, seed_data
+from recipes.models import FeedEntry, Ingredient, Recipe, Tag
+from recipes.reference_cache import ingredient_cache, tag_cache
+from users.models import User
+
+# Объем тестовых данных: тысячи рецептов, десятки тысяч строк
+# ингредиентов рецептов и основной пользователь с сотнями подписок.
+SEED_VOLUME = {
+    'recipes': 2000,
+    'ingredients': 2000,
+    'amounts_per_recipe': 10,
+    'authors': 300,
+}
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Тестовая база наполняется один раз на сессию, изменения каждого
+    теста откатываются."""
+
+    with django_db_blocker.unblock():
+        seed_data(**SEED_VOLUME)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    """Пустой кэш перед каждым тестом. Кэш в памяти процесса общий для
+    всех запросов теста, поэтому кэши, требующие общего кэша, включены."""
+
+    settings.CACHE_SHARED = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Файлы изображений каждого теста сохраняются во временный
+    каталог."""
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def reference_cache(db, clear_cache):
+    """Справочники тегов и ингредиентов и множество авторов без раскладки
+    в ленты загружены, как в работающем процессе."""
+
+    tag_cache.all()
+    ingredient_cache.all()
+    FeedEntry.objects.get_direct_author_ids()
+
+
+@pytest.fixture
+def user(db):
+    """Основной пользователь: подписан на всех авторов, имеет избранное
+    и список покупок."""
+
+    return User.objects.get(username='benchmark')
+
+
+@pytest.fixture
+def token(user):
+    """Токен основного пользователя."""
+
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def client(token):
+    """Клиент API с аутентификацией по токену. Пользователь токена уже
+    в кэше токенов, как у постоянно работающего клиента."""
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    client.get('/api/users/me/')
+    return client
+
+
+@pytest.fixture
+def anonymous():
+    """Клиент API без аутентификации."""
+
+    return APIClient()
+
+
+@pytest.fixture
+def recipe(user):
+    """Рецепт не из избранного и не из списка покупок пользователя."""
+
+    return Recipe.objects.exclude(favorites__user=user).exclude(
+        shopping_cart__user=user
+    ).first()
+
+
+@pytest.fixture
+def tag(db):
+    """Тег."""
+
+    return Tag.objects.first()
+
+
+@pytest.fixture
+def ingredients(db):
+    """Три ингредиента."""
+
+    return list(Ingredient.objects.all()[:3])
+
+
+@pytest.fixture
+def payload(tag, ingredients):
+    """Данные создания и изменения рецепта."""
+
+    return {
+        'ingredients': [{'id': ingredient.pk, 'amount': 10}
+                        for ingredient in ingredients],
+        'tags': [tag.pk],
+        'image': BENCHMARK_IMAGE,
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+    }
+
+
+@pytest.fixture
+def author(db):
+    """Автор без подписчиков."""
+
+    return User.objects.create_user(
+        username='newauthor',
+        email='newauthor@foodgram.ru',
+        first_name='Новый',
+        last_name='Автор',
+    )
+
+
+@pytest.fixture
+def timed(record_property):
+    """Выполнение запроса с записью времени ответа в отчет."""
+
+    def run(request, *args, **kwargs):
+        start = time.perf_counter()
+        response = request(*args, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        record_property(
+            'duration_ms', round((time.perf_counter() - start) * 1000, 2)
+        )
+        return response
+
+    return run
@@ -0,0 +1,56 @@
+"""Условные запросы к рецептам."""
+
+import pytest
+
+from recipes.models import RecipeIngredientsAmount
+from recipes.popularity import rebuild_popularity
+
+
+@pytest.mark.parametrize('client_name', ('client', 'anonymous'))
+@pytest.mark.parametrize('pk', ('abc', '0'))
+def test_recipe_detail_not_found(client_name, pk, request):
+    """Некорректный или несуществующий идентификатор рецепта дает 404."""
+
+    client = request.getfixturevalue(client_name)
+    assert client.get(f'/api/recipes/{pk}/').status_code == 404
+
+
+def test_recipe_list_not_modified(client, recipe,
+                                  django_capture_on_commit_callbacks):
+    """Повторный запрос списка с ETag дает 304, а изменение количества
+    ингредиента в обход сериализатора меняет ETag."""
+
+    response = client.get('/api/recipes/')
+    etag = response['ETag']
+    assert client.get(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=etag
+    ).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        amount = RecipeIngredientsAmount.objects.filter(
+            recipe=recipe
+        ).first()
+        amount.amount += 1
+        amount.save()
+    response = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_recipe_list_etag_without_queries(client,
+                                          django_assert_num_queries):
+    """Проверка ETag списка не обращается к базе."""
+
+    etag = client.get('/api/recipes/')['ETag']
+    with django_assert_num_queries(0):
+        response = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_popularity_rebuild_changes_etag(client,
+                                         django_capture_on_commit_callbacks):
+    """Пересчет популярности меняет ETag списка."""
+
+    etag = client.get('/api/recipes/')['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        rebuild_popularity()
+    assert client.get('/api/recipes/')['ETag'] != etag
@@ -0,0 +1,70 @@
+"""Денормализованные счетчики рецептов и пользователей."""
+
+from django.utils import timezone
+
+from core.counters import rebuild_counters
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+
+def get_counters(recipe, author):
+    """Счетчики рецепта и его автора из базы."""
+
+    recipe.refresh_from_db(fields=['favorites_count'])
+    author.refresh_from_db(fields=['recipes_count', 'followers_count'])
+    return recipe.favorites_count, author.recipes_count, author.followers_count
+
+
+def test_signals_move_counters(user, author):
+    """Избранное, подписка, создание и удаление рецепта меняют счетчики,
+    список покупок их не трогает."""
+
+    recipe = Recipe.objects.create(
+        author=author, name='Рецепт', text='Описание', cooking_time=10,
+        image='meal/images/recipe.png',
+    )
+    assert get_counters(recipe, author) == (0, 1, 0)
+    favorite = FavoriteRecipe.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    subscription = Subscription.objects.create(user=user, author=author)
+    assert get_counters(recipe, author) == (1, 1, 1)
+    favorite.delete()
+    ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+    subscription.delete()
+    assert get_counters(recipe, author) == (0, 1, 0)
+    recipe.delete()
+    author.refresh_from_db(fields=['recipes_count'])
+    assert author.recipes_count == 0
+
+
+def test_rebuild_counters_repairs_drift(recipe):
+    """Пересчет исправляет только разошедшиеся счетчики."""
+
+    author = User.objects.get(pk=recipe.author_id)
+    expected = get_counters(recipe, author)
+    Recipe.objects.filter(pk=recipe.pk).update(favorites_count=100)
+    User.objects.filter(pk=author.pk).update(recipes_count=0,
+                                             followers_count=7)
+    assert rebuild_counters() == {
+        'recipes.Recipe.favorites_count': 1,
+        'users.User.recipes_count': 1,
+        'users.User.followers_count': 1,
+    }
+    assert get_counters(recipe, author) == expected
+
+
+def test_stale_save_keeps_counters_and_image_variants(recipe):
+    """Сохранение устаревшего объекта рецепта не перезаписывает
+    счетчики и поле, заполняемое построением вариантов изображения."""
+
+    stale = Recipe.objects.get(pk=recipe.pk)
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=42, image_variants_of='meal/images/built.png',
+        update_at=timezone.now(),
+    )
+    stale.name = 'Новое название'
+    stale.save()
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.favorites_count == 42
+    assert recipe.image_variants_of == 'meal/images/built.png'
@@ -0,0 +1,50 @@
+"""Лента подписок при переходе автора через порог раскладки в ленты."""
+
+import pytest
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+
+@pytest.fixture
+def followers(db, settings):
+    """Два новых пользователя при пороге раскладки в один подписчик."""
+
+    settings.FEED_FANOUT_MAX_FOLLOWERS = 1
+    return [
+        User.objects.create_user(username=f'follower{index}',
+                                 email=f'follower{index}@foodgram.ru')
+        for index in range(2)
+    ]
+
+
+def create_recipe(author, name):
+    """Рецепт автора."""
+
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image='meal/images/recipe.png',
+    )
+
+
+def test_recipes_kept_after_dropping_below_threshold(
+        author, followers, django_assert_num_queries):
+    """Рецепты, опубликованные, пока автор читался напрямую, остаются
+    в ленте после того, как подписчиков стало не больше порога."""
+
+    first, second = followers
+    old = create_recipe(author, 'Старый')
+    Subscription.objects.create(user=first, author=author)
+    Subscription.objects.create(user=second, author=author)
+    assert FeedEntry.objects.get_direct_author_ids() == {author.pk}
+    new = create_recipe(author, 'Новый')
+    feed = FeedEntry.objects.get_recipes(first)
+    assert list(feed.values_list('pk', flat=True)) == [new.pk, old.pk]
+    Subscription.objects.filter(user=second, author=author).delete()
+    assert FeedEntry.objects.get_direct_author_ids() == set()
+    with django_assert_num_queries(1):
+        feed = list(FeedEntry.objects.get_recipes(first).values_list(
+            'pk', flat=True
+        ))
+    assert feed == [new.pk, old.pk]
+    assert not FeedEntry.objects.get_recipes(second).exists()
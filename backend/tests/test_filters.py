@@ -0,0 +1,71 @@
+"""Фильтр рецептов по тегам."""
+
+import pytest
+
+from recipes.models import Recipe, Tag
+
+
+@pytest.fixture
+def tagged(author):
+    """Рецепты автора с первым тегом, вторым тегом и обоими."""
+
+    first, second = Tag.objects.order_by('pk')[:2]
+    recipes = {}
+    for name, tags in (('a', [first]), ('b', [second]),
+                       ('ab', [first, second])):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание', cooking_time=10,
+            image='meal/images/recipe.png',
+        )
+        recipe.tags.set(tags)
+        recipes[name] = recipe.pk
+    return first.slug, second.slug, recipes
+
+
+def get_ids(client, author, **params):
+    """Идентификаторы рецептов автора в ответе списка."""
+
+    response = client.get('/api/recipes/', {
+        'author': author.pk, 'limit': 100, **params
+    })
+    assert response.status_code == 200
+    return [item['id'] for item in response.json()['results']]
+
+
+@pytest.mark.parametrize('mode', ('any', 'all'))
+def test_recipes_not_repeated(anonymous, author, tagged, mode):
+    """Рецепт с несколькими выбранными тегами выдается один раз."""
+
+    first, second, recipes = tagged
+    ids = get_ids(anonymous, author, tags=[first, second], tags_mode=mode)
+    assert len(ids) == len(set(ids))
+    assert recipes['ab'] in ids
+
+
+def test_modes(anonymous, author, tagged):
+    """В режиме any выдаются рецепты с любым из тегов, в режиме all -
+    только рецепты со всеми тегами."""
+
+    first, second, recipes = tagged
+    assert set(get_ids(anonymous, author, tags=[first, second])) == set(
+        recipes.values()
+    )
+    assert get_ids(anonymous, author, tags=[first, second],
+                   tags_mode='all') == [recipes['ab']]
+    assert set(get_ids(anonymous, author, tags=[first])) == {
+        recipes['a'], recipes['ab']
+    }
+
+
+@pytest.mark.parametrize('mode', ('any', 'all'))
+def test_unknown_slug(anonymous, author, tagged, mode):
+    """Неизвестный тег дает пустой результат, а не ошибку."""
+
+    assert get_ids(anonymous, author, tags=['unknown'], tags_mode=mode) == []
+
+
+def test_invalid_mode(anonymous):
+    """Неизвестный режим фильтра дает ошибку 400."""
+
+    response = anonymous.get('/api/recipes/', {'tags_mode': 'none'})
+    assert response.status_code == 400
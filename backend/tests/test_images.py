@@ -0,0 +1,79 @@
+"""Изображения рецептов и их уменьшенные копии."""
+
+import base64
+
+import pytest
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from api.serializers import Base64ImageField
+from core.benchmark import BENCHMARK_IMAGE
+from recipes import images
+from recipes.images import get_variant_name
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def variants(recipe):
+    """Рецепт с созданными уменьшенными копиями изображения."""
+
+    name = default_storage.save('meal/images/old.png', ContentFile(b'old'))
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        default_storage.save(get_variant_name(name, variant),
+                             ContentFile(b'variant'))
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image=name, image_variants_of=name
+    )
+    recipe.refresh_from_db()
+    return [get_variant_name(name, variant)
+            for variant in settings.RECIPE_IMAGE_VARIANTS]
+
+
+def test_variants_deleted_with_recipe(recipe, variants,
+                                      django_capture_on_commit_callbacks):
+    """Копии удаляются вместе с рецептом."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.delete()
+    assert not any(default_storage.exists(name) for name in variants)
+
+
+def test_variants_deleted_on_image_change(recipe, variants, monkeypatch,
+                                          django_capture_on_commit_callbacks):
+    """Копии замененного изображения удаляются, копии для нового
+    изображения ставятся в очередь."""
+
+    submitted = []
+    monkeypatch.setattr(images, 'submit_image_variants',
+                        lambda *args: submitted.append(args))
+    recipe.image = default_storage.save('meal/images/new.png',
+                                        ContentFile(b'new'))
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    assert not any(default_storage.exists(name) for name in variants)
+    assert submitted == [(recipe.pk, recipe.image.name)]
+
+
+def test_variants_kept_on_other_changes(recipe, variants,
+                                        django_capture_on_commit_callbacks):
+    """Изменение рецепта без замены изображения копии не удаляет."""
+
+    recipe.name = 'Другое название'
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    assert all(default_storage.exists(name) for name in variants)
+
+
+def test_base64_with_line_breaks():
+    """Base64 с переводами строк декодируется по частям без ошибок."""
+
+    content = base64.b64encode(
+        base64.b64decode(BENCHMARK_IMAGE.split(';base64,')[1]) * 4
+    ).decode()
+    wrapped = '\n'.join(content[start:start + 10]
+                        for start in range(0, len(content), 10))
+    field = Base64ImageField()
+    field.chunk_size = 16
+    image = field.decode(wrapped, name='temp.png')
+    assert image.read() == base64.b64decode(content)
@@ -0,0 +1,74 @@
+"""Импорт справочника ингредиентов из файлов JSON и CSV."""
+
+import json
+
+import pytest
+from django.db import connection
+
+from core.importers import import_ingredients
+from recipes.models import Ingredient
+
+RECORDS = [
+    {'name': 'импорт 1', 'measurement_unit': 'г'},
+    {'name': 'импорт 2', 'measurement_unit': 'мл'},
+    {'name': 'импорт 1', 'measurement_unit': 'г'},
+    {'name': 'импорт 3', 'measurement_unit': 'шт'},
+    {'name': '', 'measurement_unit': 'г'},
+]
+
+WRITERS = (
+    pytest.param(False, id='bulk_create'),
+    pytest.param(True, id='copy', marks=pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='COPY поддерживается только на PostgreSQL.',
+    )),
+)
+
+
+def write_json(path):
+    """Файл JSON-массива с записями RECORDS."""
+
+    path.write_text(json.dumps(RECORDS, ensure_ascii=False),
+                    encoding='utf-8')
+    return path
+
+
+def write_csv(path):
+    """Файл CSV с заголовком и записями RECORDS."""
+
+    lines = ['name,measurement_unit'] + [
+        f'{record["name"]},{record["measurement_unit"]}'
+        for record in RECORDS
+    ]
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('use_copy', WRITERS)
+@pytest.mark.parametrize('write, name', (
+    (write_json, 'ingredients.json'),
+    (write_csv, 'ingredients.csv'),
+))
+def test_import_ingredients(tmp_path, use_copy, write, name):
+    """Импорт частями внутри внешней транзакции: повторы внутри части
+    не записываются и считаются отдельно, пустые записи пропускаются,
+    существующий ингредиент не дублируется."""
+
+    Ingredient.objects.create(name='импорт 3', measurement_unit='шт')
+    path = write(tmp_path / name)
+    processed, duplicates, skipped = import_ingredients(
+        path, chunk_size=3, use_copy=use_copy
+    )
+    assert (processed, duplicates, len(skipped)) == (4, 1, 1)
+    assert sorted(Ingredient.objects.filter(
+        name__startswith='импорт'
+    ).values_list('name', 'measurement_unit')) == [
+        ('импорт 1', 'г'), ('импорт 2', 'мл'), ('импорт 3', 'шт'),
+    ]
+
+
+def test_unknown_format(tmp_path):
+    """Файл неизвестного формата не импортируется."""
+
+    with pytest.raises(ValueError):
+        import_ingredients(tmp_path / 'ingredients.xml')
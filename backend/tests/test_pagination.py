@@ -0,0 +1,93 @@
+"""Курсорная пагинация списков рецептов."""
+
+import json
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+ORDERINGS = {
+    None: ('-create_at', '-id'),
+    'popular': ('-popularity', '-id'),
+}
+
+
+@pytest.fixture
+def tied(author):
+    """Пять новых рецептов с одинаковыми датой создания
+    и популярностью, идущие первыми в обеих сортировках."""
+
+    Recipe.objects.bulk_create([
+        Recipe(author=author, name=f'Рецепт {index}', text='Описание',
+               cooking_time=10, image='meal/images/recipe.png')
+        for index in range(5)
+    ])
+    Recipe.objects.filter(name__startswith='Рецепт ', author=author).update(
+        create_at=timezone.now() + timedelta(days=1), popularity=10 ** 6
+    )
+
+
+def encode(cursor):
+    """Курсор в виде параметра запроса."""
+
+    return urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+@pytest.mark.parametrize('ordering', ORDERINGS)
+def test_walk_next_and_previous(anonymous, tied, ordering):
+    """Переход по ссылкам next и previous при повторяющихся значениях
+    первого ключа сортировки не пропускает и не повторяет рецепты."""
+
+    params = {'cursor': '', 'limit': 2}
+    if ordering:
+        params['ordering'] = ordering
+    expected = list(Recipe.objects.order_by(
+        *ORDERINGS[ordering]
+    ).values_list('pk', flat=True)[:8])
+    pages = [anonymous.get('/api/recipes/', params).json()]
+    while len(pages) < 4:
+        pages.append(anonymous.get(pages[-1]['next']).json())
+    assert [item['id'] for page in pages
+            for item in page['results']] == expected
+    assert pages[0]['previous'] is None
+    page = pages[-1]
+    for previous in reversed(pages[:-1]):
+        page = anonymous.get(page['previous']).json()
+        assert page['results'] == previous['results']
+
+
+@pytest.mark.parametrize('cursor', (
+    'abc',
+    encode('строка'),
+    encode({'v': [1], 'r': 0}),
+    encode({'v': 'ab', 'r': 0}),
+    encode({'v': ['вчера', 1], 'r': 0}),
+    encode({'v': [[1], {'id': 1}], 'r': 0}),
+    encode({'r': 0}),
+))
+def test_invalid_cursor(anonymous, cursor):
+    """Поврежденный курсор дает ошибку 400."""
+
+    response = anonymous.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('mode', ('exact', 'estimate'))
+def test_count(anonymous, mode):
+    """Количество возвращается только по запросу: точное или оценка."""
+
+    data = anonymous.get(
+        '/api/recipes/', {'cursor': '', 'count': mode}
+    ).json()
+    total = Recipe.objects.count()
+    assert isinstance(data['count'], int)
+    if mode == 'exact':
+        assert data['count'] == total
+    else:
+        assert 0 < data['count'] <= total * 2
+    assert 'count' not in anonymous.get(
+        '/api/recipes/', {'cursor': ''}
+    ).json()
@@ -0,0 +1,84 @@
+"""Пересчет популярности и сортировка рецептов по популярности."""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from recipes.popularity import rebuild_popularity
+from users.models import User
+
+
+def create_recipe(author, name):
+    """Рецепт автора."""
+
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image='meal/images/recipe.png',
+    )
+
+
+@pytest.fixture
+def popular(author):
+    """Три рецепта с одинаковой свежей активностью у двух первых
+    и устаревшей активностью у третьего. Активность двух первых выше
+    активности остальных рецептов."""
+
+    users = list(User.objects.exclude(pk=author.pk)[:50])
+    recipes = [create_recipe(author, f'Популярный {index}')
+               for index in range(3)]
+    for recipe in recipes:
+        FavoriteRecipe.objects.bulk_create([
+            FavoriteRecipe(user=user, recipe=recipe) for user in users
+        ])
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user=users[0], recipe=recipe) for recipe in recipes
+    ])
+    now = timezone.now()
+    for model in (FavoriteRecipe, ShoppingCart):
+        model.objects.filter(recipe__in=recipes).update(create_at=now)
+    FavoriteRecipe.objects.filter(recipe=recipes[2]).update(
+        create_at=now - timedelta(days=7)
+    )
+    return recipes
+
+
+def test_rebuild_decays_activity(settings, popular):
+    """Вклад добавления уменьшается вдвое за период полураспада,
+    активность за пределами окна не учитывается."""
+
+    now = timezone.now()
+    rebuild_popularity(now)
+    scores = dict(Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in popular]
+    ).values_list('pk', 'popularity'))
+    weights = settings.POPULARITY_WEIGHTS
+    fresh = 50 * weights['favorites'] + weights['shopping_cart']
+    assert scores[popular[0].pk] == pytest.approx(fresh, rel=1e-3)
+    assert scores[popular[2].pk] == pytest.approx(
+        25 * weights['favorites'] + weights['shopping_cart'], rel=1e-3
+    )
+    FavoriteRecipe.objects.filter(recipe=popular[0]).update(
+        create_at=now - timedelta(days=settings.POPULARITY_WINDOW_DAYS + 1)
+    )
+    ShoppingCart.objects.filter(recipe=popular[0]).delete()
+    rebuild_popularity(now)
+    popular[0].refresh_from_db(fields=['popularity'])
+    assert popular[0].popularity == 0
+
+
+def test_ordering_popular(anonymous, popular):
+    """Рецепты упорядочены по популярности, при равной популярности -
+    от новых к старым."""
+
+    rebuild_popularity()
+    results = anonymous.get(
+        '/api/recipes/', {'ordering': 'popular', 'limit': 10}
+    ).json()['results']
+    ids = [item['id'] for item in results]
+    assert ids[:3] == [popular[1].pk, popular[0].pk, popular[2].pk]
+    expected = list(Recipe.objects.order_by(
+        '-popularity', '-id'
+    ).values_list('pk', flat=True)[:10])
+    assert ids == expected
@@ -0,0 +1,101 @@
+"""Профилирование SQL-запросов под WSGI и ASGI."""
+
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+from core.middleware import QueryProfilingMiddleware
+
+
+@pytest.fixture
+def profiling(settings):
+    """Включенное профилирование SQL-запросов."""
+
+    settings.SQL_PROFILING = True
+
+
+@pytest.fixture
+def profiled_client(profiling, token):
+    """Клиент API с аутентификацией по токену, цепочка middleware
+    которого собрана при включенном профилировании."""
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def get_sync(url):
+    """Запрос через синхронную цепочку middleware."""
+
+    return Client().get(url)
+
+
+@async_to_sync
+async def get_async(url):
+    """Запрос через асинхронную цепочку middleware, как под ASGI."""
+
+    return await AsyncClient().get(url)
+
+
+@pytest.mark.parametrize('get', (get_sync, get_async),
+                         ids=('wsgi', 'asgi'))
+def test_query_count_header(get, profiling, recipe,
+                            django_assert_max_num_queries):
+    """Запросы к базе синхронного представления попадают в профиль
+    и при синхронной, и при асинхронной цепочке middleware."""
+
+    with django_assert_max_num_queries(5) as context:
+        response = get(f'/api/recipes/{recipe.pk}/')
+    assert response.status_code == 200
+    assert context.captured_queries
+    assert int(response['X-Query-Count']) == len(context.captured_queries)
+
+
+def test_async_chain_without_thread(profiling):
+    """В асинхронной цепочке middleware сам является корутиной
+    и не переводит запрос в поток."""
+
+    async def get_response(request):
+        return None
+
+    assert asyncio.iscoroutinefunction(
+        QueryProfilingMiddleware(get_response)
+    )
+    assert not asyncio.iscoroutinefunction(
+        QueryProfilingMiddleware(lambda request: None)
+    )
+
+
+def test_serializer_time_without_global_patch(profiled_client):
+    """Время сериализаторов замеряется в представлениях, а класс
+    BaseSerializer не изменяется."""
+
+    data = BaseSerializer.data
+    response = profiled_client.get('/api/recipes/')
+    timing = dict(
+        item.strip().split(';dur=')
+        for item in response['Server-Timing'].replace(
+            ';desc="SQL"', ''
+        ).split(',')
+    )
+    assert float(timing['serializer']) > 0
+    assert BaseSerializer.data is data
+
+
+def test_streaming_response_marked(profiled_client, caplog):
+    """Потоковому ответу не добавляются заголовки профиля, в логе
+    он отмечен полем streaming."""
+
+    with caplog.at_level('INFO', logger='core.profiling'):
+        response = profiled_client.get(
+            '/api/recipes/download_shopping_cart/?format=txt'
+        )
+    assert response.streaming
+    assert 'X-Query-Count' not in response
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['streaming'] is True
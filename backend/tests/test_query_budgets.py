@@ -0,0 +1,174 @@
+"""Верхние границы количества SQL-запросов всех маршрутов API на базе
+с тысячами рецептов. Бюджеты QUERY_BUDGETS общие с командой benchmark,
+время ответа каждого маршрута записывается в отчет (duration_ms)."""
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import BENCHMARK_PASSWORD, QUERY_BUDGETS
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscription
+
+# Маршруты чтения: имя бюджета, адрес по объектам теста и клиент.
+READ_ROUTES = (
+    ('tags-list', lambda objects: '/api/tags/', 'client'),
+    ('tags-detail', lambda objects: f'/api/tags/{objects["tag"].pk}/',
+     'client'),
+    ('ingredients-list', lambda objects: '/api/ingredients/', 'client'),
+    ('ingredients-search', lambda objects: '/api/ingredients/?name=ингр',
+     'client'),
+    ('ingredients-detail',
+     lambda objects: f'/api/ingredients/{objects["ingredients"][0].pk}/',
+     'client'),
+    ('recipes-list', lambda objects: '/api/recipes/', 'client'),
+    ('recipes-list-anonymous', lambda objects: '/api/recipes/',
+     'anonymous'),
+    ('recipes-list-filtered',
+     lambda objects: (f'/api/recipes/?tags={objects["tag"].slug}'
+                      '&is_favorited=1&is_in_shopping_cart=1'),
+     'client'),
+    ('recipes-list-popular', lambda objects: '/api/recipes/?ordering=popular',
+     'client'),
+    ('recipes-feed', lambda objects: '/api/recipes/feed/', 'client'),
+    ('recipes-detail', lambda objects: f'/api/recipes/{objects["recipe"].pk}/',
+     'client'),
+    ('recipes-download-shopping-cart',
+     lambda objects: '/api/recipes/download_shopping_cart/', 'client'),
+    ('users-list', lambda objects: '/api/users/', 'client'),
+    ('users-detail', lambda objects: f'/api/users/{objects["author"].pk}/',
+     'client'),
+    ('users-me', lambda objects: '/api/users/me/', 'client'),
+    ('users-subscriptions',
+     lambda objects: '/api/users/subscriptions/?recipes_limit=3', 'client'),
+)
+
+
+@pytest.fixture
+def objects(recipe, tag, ingredients, author):
+    """Объекты, на которые ссылаются адреса маршрутов."""
+
+    return {
+        'recipe': recipe,
+        'tag': tag,
+        'ingredients': ingredients,
+        'author': author,
+    }
+
+
+@pytest.fixture
+def created(user, payload, client):
+    """Рецепт, созданный через API."""
+
+    response = client.post('/api/recipes/', payload, format='json')
+    return Recipe.objects.get(pk=response.data['id'])
+
+
+@pytest.mark.parametrize(
+    'name, get_url, client_name', READ_ROUTES,
+    ids=[route[0] for route in READ_ROUTES],
+)
+def test_read_route(name, get_url, client_name, objects, request, timed,
+                    django_assert_max_num_queries):
+    """Маршруты чтения укладываются в бюджет на холодном кэше."""
+
+    client = request.getfixturevalue(client_name)
+    url = get_url(objects)
+    with django_assert_max_num_queries(QUERY_BUDGETS[name]):
+        response = timed(client.get, url)
+    assert response.status_code == 200
+
+
+def test_recipes_create(client, payload, timed,
+                        django_assert_max_num_queries):
+    """Создание рецепта."""
+
+    with django_assert_max_num_queries(QUERY_BUDGETS['recipes-create']):
+        response = timed(client.post, '/api/recipes/', payload,
+                         format='json')
+    assert response.status_code == 201
+
+
+def test_recipes_update(client, created, payload, ingredients, timed,
+                        django_assert_max_num_queries):
+    """Изменение рецепта с заменой части ингредиентов."""
+
+    payload['ingredients'] = [
+        {'id': ingredients[0].pk, 'amount': 5},
+        {'id': ingredients[1].pk, 'amount': 10},
+    ]
+    with django_assert_max_num_queries(QUERY_BUDGETS['recipes-update']):
+        response = timed(client.patch, f'/api/recipes/{created.pk}/',
+                         payload, format='json')
+    assert response.status_code == 200
+
+
+def test_recipes_delete(client, created, timed,
+                        django_assert_max_num_queries):
+    """Удаление рецепта."""
+
+    with django_assert_max_num_queries(QUERY_BUDGETS['recipes-delete']):
+        response = timed(client.delete, f'/api/recipes/{created.pk}/')
+    assert response.status_code == 204
+
+
+@pytest.mark.parametrize('name, path, model', (
+    ('recipes-favorite', 'favorite', FavoriteRecipe),
+    ('recipes-shopping-cart', 'shopping_cart', ShoppingCart),
+))
+def test_recipe_relation_add_remove(name, path, model, client, user, recipe,
+                                    timed, django_assert_max_num_queries):
+    """Добавление рецепта в избранное и список покупок и удаление."""
+
+    url = f'/api/recipes/{recipe.pk}/{path}/'
+    with django_assert_max_num_queries(QUERY_BUDGETS[f'{name}-add']):
+        response = timed(client.post, url)
+    assert response.status_code == 201
+    assert model.objects.filter(user=user, recipe=recipe).exists()
+    with django_assert_max_num_queries(QUERY_BUDGETS[f'{name}-remove']):
+        response = timed(client.delete, url)
+    assert response.status_code == 204
+
+
+def test_users_subscribe_unsubscribe(client, user, author, timed,
+                                     django_assert_max_num_queries):
+    """Подписка на автора и отписка."""
+
+    url = f'/api/users/{author.pk}/subscribe/'
+    with django_assert_max_num_queries(QUERY_BUDGETS['users-subscribe']):
+        response = timed(client.post, url)
+    assert response.status_code == 201
+    assert Subscription.objects.filter(user=user, author=author).exists()
+    with django_assert_max_num_queries(QUERY_BUDGETS['users-unsubscribe']):
+        response = timed(client.delete, url)
+    assert response.status_code == 204
+
+
+def test_users_set_password(client, timed, django_assert_max_num_queries):
+    """Смена пароля."""
+
+    with django_assert_max_num_queries(QUERY_BUDGETS['users-set-password']):
+        response = timed(client.post, '/api/users/set_password/', {
+            'current_password': BENCHMARK_PASSWORD,
+            'new_password': BENCHMARK_PASSWORD,
+        }, format='json')
+    assert response.status_code == 204
+
+
+def test_token_login(anonymous, user, token, timed,
+                     django_assert_max_num_queries):
+    """Получение существующего токена."""
+
+    with django_assert_max_num_queries(QUERY_BUDGETS['token-login']):
+        response = timed(anonymous.post, '/api/auth/token/login/', {
+            'email': user.email, 'password': BENCHMARK_PASSWORD,
+        }, format='json')
+    assert response.status_code == 200
+
+
+def test_token_logout(client, token, timed, django_assert_max_num_queries):
+    """Выход с удалением токена."""
+
+    with django_assert_max_num_queries(QUERY_BUDGETS['token-logout']):
+        response = timed(client.post, '/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert not Token.objects.filter(key=token.key).exists()
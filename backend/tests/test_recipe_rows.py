@@ -0,0 +1,32 @@
+"""Списки рецептов из строк values() совпадают с чтением рецепта."""
+
+from recipes.models import Ingredient, Recipe, RecipeIngredientsAmount, Tag
+
+
+def test_list_matches_detail_with_stale_reference_cache(client, tag,
+                                                        payload):
+    """Теги и ингредиенты, добавленные в обход сигналов сброса кэша
+    справочника, выводятся в списке так же, как в рецепте."""
+
+    response = client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 201
+    recipe_id = response.data['id']
+    Tag.objects.bulk_create([Tag(name='Аааа', color='#000000', slug='aaaa')])
+    Ingredient.objects.bulk_create([
+        Ingredient(name='импортированный', measurement_unit='г')
+    ])
+    Recipe.tags.through.objects.bulk_create([Recipe.tags.through(
+        recipe_id=recipe_id, tag=Tag.objects.get(slug='aaaa')
+    )])
+    RecipeIngredientsAmount.objects.bulk_create([RecipeIngredientsAmount(
+        recipe_id=recipe_id,
+        ingredient=Ingredient.objects.get(name='импортированный'),
+        amount=5,
+    )])
+    listed = client.get('/api/recipes/').json()['results'][0]
+    detail = client.get(f'/api/recipes/{recipe_id}/').json()
+    assert listed['id'] == recipe_id
+    assert [item['slug'] for item in listed['tags']] == ['aaaa', tag.slug]
+    assert listed['tags'] == detail['tags']
+    assert len(listed['ingredients']) == len(payload['ingredients']) + 1
+    assert listed['ingredients'] == detail['ingredients']
@@ -0,0 +1,99 @@
+"""Изменение рецепта и суммы списков покупок."""
+
+import pytest
+from django.db import connection
+
+from recipes.models import (Recipe, ShoppingCart, ShoppingListIngredient,
+                            Tag)
+
+
+@pytest.fixture
+def own_recipe(client, user, payload):
+    """Рецепт пользователя в его списке покупок."""
+
+    response = client.post('/api/recipes/', payload, format='json')
+    ShoppingCart.objects.create(user=user, recipe_id=response.data['id'])
+    return response.data['id']
+
+
+@pytest.fixture
+def changes(payload, ingredients):
+    """Данные изменения рецепта: количество первого ингредиента
+    увеличено до 25, остальные ингредиенты удалены, изображение
+    не меняется."""
+
+    changes = {key: value for key, value in payload.items()
+               if key != 'image'}
+    changes['ingredients'] = [{'id': ingredients[0].pk, 'amount': 25}]
+    return changes
+
+
+def get_amount(user, ingredient):
+    """Сумма ингредиента в списке покупок пользователя."""
+
+    return ShoppingListIngredient.objects.filter(
+        user=user, ingredient=ingredient
+    ).values_list('amount', flat=True).first()
+
+
+def test_update_changes_shopping_list(client, user, own_recipe, ingredients,
+                                      changes):
+    """Изменение количества меняет сумму в списке покупок, удаление
+    ингредиента из рецепта вычитает его количество."""
+
+    before = [get_amount(user, ingredient) for ingredient in ingredients]
+    response = client.patch(f'/api/recipes/{own_recipe}/', changes,
+                            format='json')
+    assert response.status_code == 200
+    assert get_amount(user, ingredients[0]) == before[0] + 15
+    assert (get_amount(user, ingredients[1]) or 0) == before[1] - 10
+
+
+@pytest.mark.skipif(not connection.features.has_select_for_update,
+                    reason='База не поддерживает SELECT FOR UPDATE.')
+def test_update_locks_recipe(client, own_recipe, changes,
+                             django_assert_max_num_queries):
+    """Строка рецепта блокируется до чтения ингредиентов рецепта."""
+
+    with django_assert_max_num_queries(20) as context:
+        client.patch(f'/api/recipes/{own_recipe}/', changes, format='json')
+    queries = [query['sql'] for query in context.captured_queries]
+    lock = next(index for index, sql in enumerate(queries)
+                if 'FOR UPDATE' in sql)
+    amounts = next(index for index, sql in enumerate(queries)
+                   if 'recipeingredientsamount' in sql)
+    assert lock < amounts
+
+
+def test_partial_update_keeps_ingredients_and_tags(client, user, own_recipe,
+                                                   ingredients, payload):
+    """Частичное изменение без ингредиентов и тегов меняет только
+    переданные поля."""
+
+    before = get_amount(user, ingredients[0])
+    response = client.patch(
+        f'/api/recipes/{own_recipe}/', {'name': 'Новое название'},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert response.data['name'] == 'Новое название'
+    assert [item['id'] for item in response.data['tags']] == payload['tags']
+    assert [{'id': item['id'], 'amount': item['amount']}
+            for item in response.data['ingredients']] == (
+        payload['ingredients']
+    )
+    assert get_amount(user, ingredients[0]) == before
+
+
+def test_partial_update_tags_only(client, own_recipe, payload):
+    """Частичное изменение только тегов не трогает ингредиенты."""
+
+    other = Tag.objects.exclude(
+        pk__in=Recipe.objects.get(pk=own_recipe).tags.all()
+    ).first()
+    response = client.patch(
+        f'/api/recipes/{own_recipe}/', {'tags': [other.pk]}, format='json'
+    )
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['tags']] == [other.pk]
+    assert len(response.data['ingredients']) == len(payload['ingredients'])
@@ -0,0 +1,79 @@
+"""Справочники тегов и ингредиентов, отставшие от базы."""
+
+from types import SimpleNamespace
+
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import IngredientFilter
+from recipes.models import Ingredient
+from recipes.reference_cache import ingredient_cache
+
+
+def create_bypassing_signals(name):
+    """Ингредиент, созданный без сигналов сброса кэша справочника."""
+
+    Ingredient.objects.bulk_create([
+        Ingredient(name=name, measurement_unit='г')
+    ])
+    return Ingredient.objects.get(name=name)
+
+
+def test_get_many_loads_missing_from_database(django_assert_num_queries):
+    """Записи, которых нет в снимке, дочитываются одним запросом."""
+
+    ingredient = create_bypassing_signals('новый ингредиент')
+    known = Ingredient.objects.first()
+    with django_assert_num_queries(1):
+        records = ingredient_cache.get_many([known.pk, ingredient.pk, 0])
+    assert [record.id for record in records] == [known.pk, ingredient.pk]
+    assert records[1].name == 'новый ингредиент'
+
+
+def test_recipe_with_imported_ingredient(client, payload):
+    """Ингредиент, добавленный в обход сигналов (как importdata в другом
+    процессе), принимается при создании рецепта."""
+
+    ingredient = create_bypassing_signals('импортированный')
+    response = client.post('/api/recipes/', {
+        **payload, 'ingredients': [{'id': ingredient.pk, 'amount': 10}],
+    }, format='json')
+    assert response.status_code == 201
+    assert response.data['ingredients'][0]['id'] == ingredient.pk
+
+
+def test_unknown_ingredient_rejected(client, payload):
+    """Несуществующий ингредиент по-прежнему отклоняется."""
+
+    response = client.post('/api/recipes/', {
+        **payload, 'ingredients': [{'id': 0, 'amount': 10}],
+    }, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('name', ('ингр', 'диент 01', 'Соль'))
+def test_ingredient_search_matches_filter(anonymous, name):
+    """Выдача поиска ингредиентов совпадает с ранжированием
+    IngredientFilter в базе, откуда бы она ни была взята."""
+
+    create_bypassing_signals('морская соль')
+    create_bypassing_signals('соль')
+    expected = list(IngredientFilter().filter_queryset(
+        Request(APIRequestFactory().get('/', {'name': name})),
+        Ingredient.objects.all(),
+        SimpleNamespace(action='list'),
+    ).values_list('name', flat=True))
+    response = anonymous.get('/api/ingredients/', {'name': name})
+    assert [item['name'] for item in response.json()] == expected
+
+
+def test_prefix_search_from_cache(anonymous, django_assert_num_queries):
+    """Поиск, которому хватает совпадений по началу названия,
+    не обращается к базе, поиск по подстроке выполняется в базе."""
+
+    with django_assert_num_queries(0):
+        anonymous.get('/api/ingredients/', {'name': 'ингр'})
+    with django_assert_num_queries(1):
+        response = anonymous.get('/api/ingredients/', {'name': 'диент 01'})
+    assert response.json()
@@ -0,0 +1,24 @@
+"""Множества избранного, списка покупок и подписок пользователя."""
+
+from api.relations import UserRelations
+
+
+def test_cached_with_shared_cache(user, django_assert_num_queries):
+    """При общем кэше множества загружаются из базы один раз."""
+
+    with django_assert_num_queries(1):
+        UserRelations(user).get('favorites')
+    with django_assert_num_queries(0):
+        UserRelations(user).get('favorites')
+
+
+def test_not_cached_without_shared_cache(user, settings,
+                                         django_assert_num_queries):
+    """Без общего кэша множества не сохраняются в кэш процесса."""
+
+    settings.CACHE_SHARED = False
+    with django_assert_num_queries(1):
+        favorites = UserRelations(user).get('favorites')
+    assert favorites
+    with django_assert_num_queries(1):
+        UserRelations(user).get('favorites')
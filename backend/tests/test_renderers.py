@@ -0,0 +1,29 @@
+"""Выгрузка списка покупок в разных форматах."""
+
+import pytest
+
+
+@pytest.mark.parametrize('file_format', ('txt', 'csv', 'json'))
+def test_error_rendered_as_json(anonymous, file_format):
+    """Ошибка выгрузки отдается в JSON при любом выбранном формате."""
+
+    response = anonymous.get(
+        f'/api/recipes/download_shopping_cart/?format={file_format}'
+    )
+    assert response.status_code == 401
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+@pytest.mark.parametrize('file_format, content_type', (
+    ('txt', 'text/plain'),
+    ('csv', 'text/csv'),
+))
+def test_file_format(client, file_format, content_type):
+    """Файл отдается в выбранном формате."""
+
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={file_format}'
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith(content_type)
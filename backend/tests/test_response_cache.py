@@ -0,0 +1,50 @@
+"""Кэш готовых ответов для анонимных пользователей."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.mixins import RetrieveModelMixin
+
+from api.response_cache import bump_author_versions
+
+
+def test_detail_cached(anonymous, recipe, django_assert_num_queries):
+    """Повторный запрос страницы рецепта отдается из кэша."""
+
+    url = f'/api/recipes/{recipe.pk}/'
+    first = anonymous.get(url)
+    with django_assert_num_queries(0):
+        second = anonymous.get(url)
+    assert second.content == first.content
+
+
+def test_author_change_during_request_not_cached(anonymous, recipe,
+                                                 monkeypatch):
+    """Изменение автора во время выполнения запроса не оставляет
+    в кэше ответ со старым профилем."""
+
+    retrieve = RetrieveModelMixin.retrieve
+
+    def retrieve_and_change_author(self, request, *args, **kwargs):
+        response = retrieve(self, request, *args, **kwargs)
+        bump_author_versions(recipe.author_id)
+        return response
+
+    monkeypatch.setattr(RetrieveModelMixin, 'retrieve',
+                        retrieve_and_change_author)
+    url = f'/api/recipes/{recipe.pk}/'
+    anonymous.get(url)
+    monkeypatch.setattr(RetrieveModelMixin, 'retrieve', retrieve)
+    with CaptureQueriesContext(connection) as context:
+        anonymous.get(url)
+    assert context.captured_queries
+
+
+def test_disabled_without_shared_cache(anonymous, recipe, settings):
+    """Без общего кэша ответы не кэшируются."""
+
+    settings.CACHE_SHARED = False
+    url = f'/api/recipes/{recipe.pk}/'
+    anonymous.get(url)
+    with CaptureQueriesContext(connection) as context:
+        anonymous.get(url)
+    assert context.captured_queries
@@ -0,0 +1,80 @@
+"""Кэш пользователей по токенам."""
+
+from django.core.cache import cache
+
+from api.authentication import token_cache
+from users.models import User
+
+
+def test_logout_revokes_token(client, django_capture_on_commit_callbacks):
+    """После выхода токен больше не принимается."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert client.get('/api/users/me/').status_code == 401
+
+
+def test_deactivated_user_rejected(client, user,
+                                   django_capture_on_commit_callbacks):
+    """Изменение пользователя сбрасывает запись его токена."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+    assert client.get('/api/users/me/').status_code == 401
+
+
+def test_stale_version_not_stored(user, token):
+    """Пользователь, прочитанный из базы до сброса, сохраняется
+    с прочитанной до запроса к базе версией и не используется."""
+
+    cached, version = token_cache.get(token.key)
+    assert cached is None
+    token_cache.invalidate(token.key)
+    token_cache.set(token.key, user, version)
+    assert token_cache.get(token.key)[0] is None
+
+
+def test_other_users_keep_cache(client, token, author,
+                                django_capture_on_commit_callbacks,
+                                django_assert_num_queries):
+    """Регистрация и изменение других пользователей не сбрасывают
+    записи чужих токенов."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        User.objects.create_user(username='another', email='a@foodgram.ru')
+        author.first_name = 'Другое'
+        author.save()
+    assert token_cache.get(token.key)[0] is not None
+    with django_assert_num_queries(0):
+        client.get('/api/users/me/')
+
+
+def test_disabled_without_shared_cache(client, settings,
+                                       django_assert_max_num_queries):
+    """Без общего кэша пользователь токена читается из базы в каждом
+    запросе."""
+
+    settings.CACHE_SHARED = False
+    for _ in range(2):
+        with django_assert_max_num_queries(2) as context:
+            client.get('/api/users/me/')
+        assert sum('authtoken_token' in query['sql']
+                   for query in context.captured_queries) == 1
+
+
+def test_shared_cache_keeps_only_user_id(client, user, token,
+                                         django_assert_num_queries):
+    """В общем кэше хранится только идентификатор пользователя, после
+    сброса LRU процесса пользователь читается по первичному ключу."""
+
+    version = token_cache.get(token.key)[1]
+    assert cache.get(token_cache.get_shared_key(version, token.key)) == (
+        user.pk
+    )
+    token_cache._entries.clear()
+    with django_assert_num_queries(1) as context:
+        response = client.get('/api/users/me/')
+    assert response.status_code == 200
+    assert 'authtoken_token' not in context.captured_queries[0]['sql']
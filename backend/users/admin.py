@@ -13,13 +13,11 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'password',
+        'recipes_count',
+        'followers_count',
     )
-    list_filter = (
-        'email',
-        'first_name',
-        'recipe__tags'
-    )
-    search_fields = ('email', 'first_name')
+    list_filter = ('recipe__tags',)
+    search_fields = ('email', 'username', 'first_name', 'last_name')
     empty_value_display = '-пусто-'
 
 
@@ -32,6 +30,8 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'author',
         'created_at',
     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
     list_filter = ('author__recipe__tags',)
     empty_value_display = '-пусто-'
 
@@ -6,3 +6,8 @@ class UsersConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        """Подключение сигналов приложения."""
+
+        import users.signals  # noqa: F401
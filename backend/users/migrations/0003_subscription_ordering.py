@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscription',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+    ]
@@ -1,12 +1,15 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.models import CounterFieldsMixin
 from foodgram_backend import model_settings as set
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     """Модель пользователя."""
 
+    counter_fields = ('recipes_count', 'followers_count')
+
     username = models.CharField(
         'Имя пользователя',
         max_length=set.USER_USERNAME_LENGTH,
@@ -37,6 +40,16 @@ class User(AbstractUser):
         blank=False,
         help_text='Например "Петров"'
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -80,7 +93,7 @@ class Subscription(models.Model):
                 name='unique_follow',
             )
         ]
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from core.counters import change_counter_across
+from users.models import Subscription, User
+
+# Сигнал перехода счетчика подписчиков автора через
+# FEED_FANOUT_MAX_FOLLOWERS. Отправляется с аргументами author_id
+# и fanout: True, если рецепты автора снова раскладываются в ленты.
+fanout_threshold_crossed = Signal()
+
+
+def change_followers_count(author_id, delta):
+    """Изменение счетчика подписчиков автора с отправкой сигнала
+    при переходе через порог раскладки рецептов в ленты."""
+
+    if change_counter_across(User, author_id, 'followers_count', delta,
+                             settings.FEED_FANOUT_MAX_FOLLOWERS):
+        fanout_threshold_crossed.send(
+            sender=User, author_id=author_id, fanout=delta < 0
+        )
+
+
+@receiver(post_save, sender=Subscription)
+def increase_followers_count(sender, instance, created, **kwargs):
+    """Увеличение счетчика подписчиков автора."""
+
+    if created:
+        change_followers_count(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrease_followers_count(sender, instance, **kwargs):
+    """Уменьшение счетчика подписчиков автора."""
+
+    change_followers_count(instance.author_id, -1)